@@ -11,7 +11,10 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[(f'{Path(nicegui.__file__).parent}{os.pathsep}nicegui', 'nicegui')],
+    datas=[
+        (f'{Path(nicegui.__file__).parent}{os.pathsep}nicegui', 'nicegui'),
+        ('seedplayer/catalogs', 'seedplayer/catalogs'),
+    ],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.startup import summarize
+from benchmarks.synthetic import LAYOUTS, generate_tree
+from seedplayer.books import book_resolver, get_bible_book_number, load_catalog
+from seedplayer.copier import CopyOptions, sync_files
+from seedplayer.export import execute_export_plan
+from seedplayer.library import source_library
+from seedplayer.listing import DirectoryCache, list_directories
+from seedplayer.ordering import tag_cache
+from seedplayer.plan import fix_filename, plan_export
+from seedplayer.scan import scan_source
+
+LAYOUT_CONTENT_TYPES = {"bible": "Bible", "nested": "Bible", "other": "Other"}
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def default_destinations() -> dict:
+    destinations = {"disk": tempfile.gettempdir()}
+    if os.path.isdir("/dev/shm"):
+        destinations["tmpfs"] = "/dev/shm"
+    return destinations
+
+
+def tree_phases(src: Path, content_type: str, runs: int, work_dir: Path) -> tuple:
+    scans, cold_plans, warm_plans = [], [], []
+    indexed_scans, indexed_plans = [], []
+    tag_cache.path = work_dir / "tags.json"
+    # Setting the path alone would keep using the database already open.
+    source_library.close()
+    source_library.path = work_dir / "library.sqlite3"
+    plan = None
+    for _ in range(runs):
+        seconds, source = timed(scan_source, str(src))
+        scans.append(seconds)
+        tag_cache.clear()
+        source_library.clear()
+        seconds, plan = timed(
+            plan_export, content_type, str(src), str(work_dir), source=source
+        )
+        cold_plans.append(seconds)
+        source_library.clear()
+        seconds, plan = timed(
+            plan_export, content_type, str(src), str(work_dir), source=source
+        )
+        warm_plans.append(seconds)
+        # The library index now holds the tree and the plan.
+        source_library.scan(str(src))
+        seconds, source = timed(source_library.scan, str(src))
+        indexed_scans.append(seconds)
+        seconds, plan = timed(
+            plan_export, content_type, str(src), str(work_dir), source=source
+        )
+        indexed_plans.append(seconds)
+    return plan, {
+        "scan": summarize(scans),
+        "plan_cold_tags": summarize(cold_plans),
+        "plan_warm_tags": summarize(warm_plans),
+        "scan_indexed": summarize(indexed_scans),
+        "plan_indexed": summarize(indexed_plans),
+    }
+
+
+def copy_phase(plan, dst_directory: str, runs: int, workers: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        target = Path(tempfile.mkdtemp(prefix="seedplayer-bench-", dir=dst_directory))
+        try:
+            target_plan = plan.rebase(str(target))
+            started = time.perf_counter()
+            execute_export_plan(target_plan, workers, copy_options=CopyOptions())
+            sync_files([f.dst for f in target_plan.files])
+            samples.append(time.perf_counter() - started)
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+    report = summarize(samples)
+    report["rate"] = plan.total_bytes / report["median"] if report["median"] else 0.0
+    return report
+
+
+def micro(function, inputs: list, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for value in inputs:
+            function(*value)
+        samples.append((time.perf_counter() - started) / len(inputs) * 1e6)
+    report = summarize(samples)
+    report["unit"] = "us/call"
+    report["calls"] = len(inputs)
+    return report
+
+
+def microbenchmarks(src: Path, iterations: int) -> dict:
+    books = load_catalog("en")
+    names = [(alias,) for b in books for alias in [b["name"]] + b["abbreviations"]]
+    names += [(f"{b['number']:02}_{b['name']}",) for b in books]
+    files = [
+        (f"{b['name'].replace(' ', '')}_{chapter}.mp3", chapter)
+        for b in books
+        for chapter in range(1, 11)
+    ]
+    folders = [str(p) for p in src.iterdir() if p.is_dir()]
+    cache = DirectoryCache()
+    for folder in folders:
+        cache.load(folder)
+
+    book_resolver.cache_clear()
+    index_seconds, _ = timed(book_resolver)
+    return {
+        "book_index_load_seconds": index_seconds,
+        "get_bible_book_number": micro(get_bible_book_number, names, iterations),
+        "fix_filename": micro(fix_filename, files, iterations),
+        "list_directories": micro(
+            list_directories, [(f,) for f in folders], iterations
+        ),
+        "directory_cache_hit": micro(cache.get, [(f,) for f in folders], iterations),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark SeedPlayer exports on synthetic trees and report JSON."
+    )
+    parser.add_argument(
+        "--layout", choices=LAYOUTS, action="append", help="default: all layouts"
+    )
+    parser.add_argument("--file-size", type=int, default=256 * 1024)
+    parser.add_argument("--other-files", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument(
+        "--dst",
+        action="append",
+        metavar="NAME=PATH",
+        help="copy destination to time, repeatable (default: disk and tmpfs)",
+    )
+    parser.add_argument("--work-dir", help="where to build source trees")
+    parser.add_argument("--skip-copy", action="store_true")
+    args = parser.parse_args(argv)
+
+    destinations = default_destinations()
+    if args.dst:
+        destinations = dict(d.split("=", 1) for d in args.dst)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "file_size": args.file_size,
+        "runs": args.runs,
+        "layouts": dict(),
+    }
+    work_dir = Path(tempfile.mkdtemp(prefix="seedplayer-bench-", dir=args.work_dir))
+    try:
+        for layout in args.layout or LAYOUTS:
+            src = work_dir / layout / "src"
+            seconds, tree = timed(
+                generate_tree, src, layout, args.file_size, args.other_files
+            )
+            tree["generate_seconds"] = seconds
+            plan, phases = tree_phases(
+                src, LAYOUT_CONTENT_TYPES[layout], args.runs, work_dir / layout
+            )
+            tree.update(phases)
+            if not args.skip_copy:
+                tree["copy"] = {
+                    name: copy_phase(plan, path, args.runs, args.workers)
+                    for name, path in destinations.items()
+                }
+            report["layouts"][layout] = tree
+        layout = (args.layout or LAYOUTS)[0]
+        report["micro"] = microbenchmarks(work_dir / layout / "src", args.iterations)
+    finally:
+        source_library.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
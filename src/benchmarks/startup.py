@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def time_to_first_window(command: list, timeout: float) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        marker = Path(tmp) / "first-window"
+        env = dict(os.environ, SEEDPLAYER_STARTUP_PROBE=str(marker))
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            command,
+            cwd=SRC_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not marker.exists():
+                if process.poll() is not None:
+                    raise RuntimeError(
+                        f"{command[0]} exited with {process.returncode} "
+                        "before opening a window"
+                    )
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"no window after {timeout:.0f}s")
+                time.sleep(0.01)
+            return time.perf_counter() - started
+        finally:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def parse_import_times(output: str, top: int) -> list:
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        modules.append(
+            {
+                "module": match.group(4),
+                "depth": (len(match.group(3)) - 1) // 2,
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+            }
+        )
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def gui_import_times(timeout: float, top: int) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ, SEEDPLAYER_STARTUP_PROBE=str(Path(tmp) / "first-window")
+        )
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py"],
+            cwd=SRC_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    return parse_import_times(process.stderr, top)
+
+
+def cli_timings(top: int) -> dict:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import seedplayer.cli"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "seedplayer_export.py", "--help"],
+        cwd=SRC_DIR,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return {
+        "help_seconds": time.perf_counter() - started,
+        "imports": parse_import_times(process.stderr, top),
+    }
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "samples": samples,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time SeedPlayer Content Tool startup and report JSON."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=25, help="modules to report")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--exe", help="time a packaged build instead of main.py (window only)"
+    )
+    parser.add_argument(
+        "--skip-gui", action="store_true", help="only time the headless CLI"
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "runs": args.runs,
+    }
+    if not args.skip_gui:
+        command = [args.exe] if args.exe else [sys.executable, "main.py"]
+        report["first_window_seconds"] = summarize(
+            [time_to_first_window(command, args.timeout) for _ in range(args.runs)]
+        )
+        if not args.exe:
+            report["imports"] = gui_import_times(args.timeout, args.top)
+    report["cli"] = cli_timings(args.top)
+
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
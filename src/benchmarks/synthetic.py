@@ -0,0 +1,83 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from seedplayer.books import load_catalog
+
+# Chapters per book, Genesis to Revelation: 929 + 260 = 1,189.
+BIBLE_CHAPTERS = [
+    50, 40, 27, 36, 34, 24, 21, 4, 31, 24, 22, 25, 29, 36, 10, 13, 10, 42, 150,
+    31, 12, 8, 66, 52, 5, 48, 12, 14, 3, 9, 1, 4, 7, 3, 3, 3, 2, 14, 4,
+    28, 16, 24, 21, 28, 16, 16, 13, 6, 6, 4, 4, 5, 3, 6, 4, 3, 1, 13, 5, 5, 3,
+    5, 1, 1, 1, 22,
+]  # fmt: skip
+LAYOUTS = ["bible", "nested", "other"]
+
+
+def syncsafe(size: int) -> bytes:
+    return bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def mp3_bytes(track: int, size: int, audio: bytes) -> bytes:
+    text = b"\x00" + str(track).encode()
+    frame = b"TRCK" + len(text).to_bytes(4, "big") + b"\x00\x00" + text
+    tag = b"ID3\x03\x00\x00" + syncsafe(len(frame)) + frame
+    return tag + audio[: max(0, size - len(tag))]
+
+
+def write_file(path: Path, track: int, size: int, audio: bytes):
+    with open(path, "wb") as f:
+        f.write(mp3_bytes(track, size, audio))
+
+
+def generate_tree(
+    root: Path, layout: str, file_size: int, other_files: int = 5000
+) -> dict:
+    # The same random block is reused for every file; content doesn't matter
+    # to the exporter, and generating it must stay cheap next to the copy.
+    audio = b"\xff\xfb\x90\x64" + os.urandom(max(0, file_size - 4))
+    files = 0
+    if layout == "other":
+        per_folder = 100
+        for index in range(other_files):
+            folder = root / f"Series {index // per_folder + 1}"
+            folder.mkdir(parents=True, exist_ok=True)
+            name = f"Talk {index % per_folder + 1}.mp3"
+            write_file(folder / name, 1, file_size, audio)
+            files += 1
+        return {"layout": layout, "files": files, "bytes": files * file_size}
+
+    books = load_catalog("en")
+    for book, chapters in zip(books, BIBLE_CHAPTERS):
+        folder = root / book["name"]
+        if layout == "nested":
+            testament = "Old Testament" if book["number"] < 40 else "New Testament"
+            folder = root / testament / f"{book['number']:02}_{book['name']}"
+        folder.mkdir(parents=True, exist_ok=True)
+        prefix = book["name"].replace(" ", "")
+        for chapter in range(1, chapters + 1):
+            write_file(folder / f"{prefix}_{chapter}.mp3", chapter, file_size, audio)
+            files += 1
+    return {"layout": layout, "files": files, "bytes": files * file_size}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic SeedPlayer source tree."
+    )
+    parser.add_argument("root", help="folder to create the tree in")
+    parser.add_argument("--layout", choices=LAYOUTS, default="bible")
+    parser.add_argument("--file-size", type=int, default=256 * 1024)
+    parser.add_argument("--other-files", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    tree = generate_tree(
+        Path(args.root), args.layout, args.file_size, args.other_files
+    )
+    print(f"{tree['files']} files, {tree['bytes']} bytes in {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
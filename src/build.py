@@ -1,14 +1,37 @@
+import argparse
 import os
 import subprocess
 from pathlib import Path
 import nicegui
 
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '--onedir',
+    action='store_true',
+    help='startup-optimized build: ship a folder so launches skip unpacking',
+)
+args = parser.parse_args()
+
 cmd = [
     'pyinstaller',
-    'main.py', # your main file with ui.run()
+    'main.py', # entry point, the UI itself is in seedplayer_app.py
     '--name', 'SeedPlayer Content Tool', # name of your app
-    '--onefile',
+    '--onedir' if args.onedir else '--onefile',
     '--windowed', # prevent console appearing, only use with ui.run(native=True, ...)
-    '--add-data', f'{Path(nicegui.__file__).parent}{os.pathsep}nicegui'       
+    '--add-data', f'{Path(nicegui.__file__).parent}{os.pathsep}nicegui',
+    '--add-data', f'seedplayer/catalogs{os.pathsep}seedplayer/catalogs', # book name catalogs
 ]
+if args.onedir:
+    cmd.append('--noupx') # UPX binaries are decompressed again on every launch
 subprocess.call(cmd)
+
+cli_cmd = [
+    'pyinstaller',
+    'seedplayer_export.py', # headless command line exporter
+    '--name', 'seedplayer-export',
+    '--onefile',
+    '--console',
+    '--exclude-module', 'nicegui',
+    '--add-data', f'seedplayer/catalogs{os.pathsep}seedplayer/catalogs',
+]
+subprocess.call(cli_cmd)
@@ -0,0 +1,275 @@
+import lzma
+import os
+import tarfile
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from .cancel import CancellationToken, ExportCancelled
+from .copier import CopyOptions, DirectorySync, SyncMode, buffered_copy
+from .instrument import ExportMetrics, timed_phase
+from .progress import ExportProgress
+from .scan import SourceDirectory, SourceFile
+from .tags import ID3V1_SIZE, ID3V2_HEADER_SIZE, id3v2_tag_size, is_frame_sync
+
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+TAR_RECORD_SIZE = tarfile.RECORDSIZE
+
+# What the archive modules raise for a damaged or truncated archive; bz2
+# and gzip header errors are OSErrors already.
+ARCHIVE_ERRORS = (
+    tarfile.TarError,
+    zipfile.BadZipFile,
+    EOFError,
+    zlib.error,
+    lzma.LZMAError,
+)
+
+
+def is_archive(path: str) -> bool:
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def member_name(name: str) -> str:
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    return "/".join(parts)
+
+
+def archive_members(path: str):
+    # Yields (name, size, mtime_ns, open_member) in archive order. Zip
+    # entries come from the central directory; tar has no index, so the
+    # member headers are read in one pass.
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+                yield (
+                    member_name(info.filename),
+                    info.file_size,
+                    int(mtime * 1e9),
+                    lambda info=info: archive.open(info),
+                )
+    else:
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                yield (
+                    member_name(member.name),
+                    member.size,
+                    int(member.mtime * 1e9),
+                    lambda member=member: archive.extractfile(member),
+                )
+            # tarfile takes a damaged member header for the end of the
+            # archive, so only the end-of-archive padding may be left. Reading
+            # it also runs the compressed stream's own integrity check.
+            while chunk := archive.fileobj.read(TAR_RECORD_SIZE):
+                if len(chunk.strip(b"\0")) > 0:
+                    raise tarfile.ReadError("damaged member header")
+
+
+@contextmanager
+def reading_archive(path: str):
+    # Surfaces archive errors as OSError, like any other source that can't
+    # be read, so callers handle both the same way.
+    try:
+        yield
+    except ARCHIVE_ERRORS as ex:
+        reason = str(ex).splitlines()[0] if str(ex) else type(ex).__name__
+        raise OSError(f"{path} is damaged or not a supported archive: {reason}") from ex
+
+
+def archive_directory(directories: dict, path: str, name: str) -> SourceDirectory:
+    directory = directories.get(name)
+    if directory is None:
+        parent_name, _, base_name = name.rpartition("/")
+        parent = archive_directory(directories, path, parent_name)
+        directory = SourceDirectory(base_name, os.path.join(path, *name.split("/")))
+        parent.children.append(directory)
+        directories[name] = directory
+    return directory
+
+
+def add_totals(directory: SourceDirectory):
+    directory.total_files = len(directory.files)
+    directory.total_bytes = sum(f.size for f in directory.files)
+    for child in directory.children:
+        add_totals(child)
+        directory.total_files += child.total_files
+        directory.total_bytes += child.total_bytes
+
+
+def scan_archive(path: str, name: Optional[str] = None) -> SourceDirectory:
+    # Builds the same tree scan_source does for a folder. Member paths are
+    # the archive path joined with the name inside it, so plans, manifests
+    # and previews treat the archive like the folder it would extract to.
+    if name is None:
+        name = os.path.basename(path)
+    root = SourceDirectory(name, path, mtime_ns=os.stat(path).st_mtime_ns)
+    directories = {"": root}
+    with reading_archive(path):
+        for member, size, mtime_ns, _ in archive_members(path):
+            if not member.endswith(".mp3"):
+                continue
+            parent_name, _, file_name = member.rpartition("/")
+            archive_directory(directories, path, parent_name).files.append(
+                SourceFile(
+                    file_name, os.path.join(path, *member.split("/")), size, mtime_ns
+                )
+            )
+    add_totals(root)
+    return root
+
+
+def write_all(fdst, data: bytes, progress: Optional[ExportProgress]):
+    chunk = memoryview(data)
+    while len(chunk) > 0:
+        chunk = chunk[fdst.write(chunk) :]
+    if progress is not None:
+        progress.add_bytes(len(data))
+
+
+def skip_member_bytes(
+    fsrc,
+    count: int,
+    buffer_size: int,
+    cancel: Optional[CancellationToken] = None,
+):
+    while count > 0 and (chunk := fsrc.read(min(count, buffer_size))):
+        if cancel is not None:
+            cancel.check()
+        count -= len(chunk)
+
+
+def copy_member_audio(
+    fsrc,
+    fdst,
+    size: int,
+    buffer_size: int,
+    progress: Optional[ExportProgress],
+    cancel: Optional[CancellationToken] = None,
+):
+    # The same cut audio_range makes, reading forward: seeking back in a
+    # compressed tar restarts decompression from the top of the archive.
+    # Tags are read past in chunks, as cover art can run to megabytes; head
+    # holds what has been read of the audio after them.
+    head = b""
+    start = 0
+    while start + ID3V2_HEADER_SIZE <= size:
+        head = fsrc.read(ID3V2_HEADER_SIZE)
+        tag_size = id3v2_tag_size(head)
+        if tag_size <= 0:
+            break
+        skip_member_bytes(fsrc, tag_size - ID3V2_HEADER_SIZE, buffer_size, cancel)
+        start += tag_size
+        head = b""
+    if start > 0 and len(head) < 2:
+        head += fsrc.read(2 - len(head))
+    if start > 0 and not is_frame_sync(head):
+        # Keep the file whole, as audio_range does. Only a damaged tag gets
+        # here, so the slow seek back is rare.
+        fsrc.seek(0)
+        head = b""
+        start = 0
+
+    rest = size - start - len(head)
+    if rest < ID3V1_SIZE:
+        audio = head + fsrc.read(rest)
+        if len(audio) >= ID3V1_SIZE and audio[-ID3V1_SIZE:][:3] == b"TAG":
+            audio = audio[:-ID3V1_SIZE]
+        write_all(fdst, audio, progress)
+        written = len(audio)
+    else:
+        write_all(fdst, head, progress)
+        buffered_copy(fsrc, fdst, buffer_size, rest - ID3V1_SIZE, progress, cancel)
+        tail = fsrc.read(ID3V1_SIZE)
+        if tail[:3] == b"TAG":
+            tail = b""
+        write_all(fdst, tail, progress)
+        written = len(head) + rest - ID3V1_SIZE + len(tail)
+    if progress is not None and written < size:
+        progress.skip_bytes(size - written)
+
+
+def copy_member(
+    fsrc,
+    size: int,
+    mtime_ns: int,
+    dst: Path,
+    options: CopyOptions,
+    progress: Optional[ExportProgress],
+    cancel: Optional[CancellationToken] = None,
+):
+    try:
+        with open(dst, "wb", buffering=0) as fdst:
+            if options.strip_tags:
+                copy_member_audio(
+                    fsrc, fdst, size, options.buffer_size, progress, cancel
+                )
+            else:
+                buffered_copy(fsrc, fdst, options.buffer_size, size, progress, cancel)
+            if options.sync_mode == SyncMode.FILE:
+                os.fsync(fdst.fileno())
+    except ExportCancelled:
+        dst.unlink(missing_ok=True)
+        raise
+    if options.preserve_metadata:
+        os.utime(dst, ns=(mtime_ns, mtime_ns))
+
+
+def copy_archive_members(
+    archive: str,
+    copy_jobs: list,
+    progress: Optional[ExportProgress] = None,
+    options: Optional[CopyOptions] = None,
+    metrics: Optional[ExportMetrics] = None,
+    cancel: Optional[CancellationToken] = None,
+):
+    # Members are streamed in archive order from a single open archive, which
+    # is the only way through a compressed tar and keeps zip reads sequential.
+    if options is None:
+        options = CopyOptions()
+    wanted = {Path(src).relative_to(archive).as_posix(): dst for src, dst in copy_jobs}
+    directory_sync = None
+    if options.sync_mode == SyncMode.DIRECTORY:
+        directory_sync = DirectorySync(copy_jobs)
+    completed = []
+    try:
+        with reading_archive(archive):
+            for name, size, mtime_ns, open_member in archive_members(archive):
+                dst = wanted.get(name)
+                if dst is None:
+                    continue
+                if cancel is not None:
+                    cancel.check()
+                started = time.perf_counter()
+                with open_member() as fsrc:
+                    copy_member(
+                        fsrc, size, mtime_ns, Path(dst), options, progress, cancel
+                    )
+                if metrics is not None:
+                    metrics.file_done(
+                        dst, os.path.getsize(dst), time.perf_counter() - started
+                    )
+                if directory_sync is not None:
+                    with timed_phase(metrics, "directory_sync"):
+                        directory_sync.file_done(dst)
+                completed.append(dst)
+                if progress is not None:
+                    progress.file_done()
+    except ExportCancelled:
+        raise ExportCancelled(completed)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import unicodedata
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .paths import user_cache_dir
+
+CATALOG_DIR = Path(__file__).resolve().parent / "catalogs"
+DEFAULT_LANGUAGES = ("en",)
+INDEX_VERSION = 1
+
+ORDINAL_WORDS = {"first": "1", "second": "2", "third": "3"}
+ROMAN_NUMERALS = {"i": "1", "ii": "2", "iii": "3"}
+ORDINAL_NUMBER = re.compile(r"(?<![a-z0-9])(?:1st|2nd|3rd)(?![a-z0-9])")
+ATTACHED_ROMAN_NUMERAL = re.compile(r"^(iii|ii|i)([a-z]{2,})$")
+PARENTHETICAL = re.compile(r"\([^)]*\)|\[[^\]]*\]|\{[^}]*\}")
+NAME_TOKEN = re.compile(r"[a-z]+|\d+")
+
+MIN_BOOK_CONFIDENCE = 0.6
+
+
+class BibleSection(Enum):
+    FULL = 0
+    OLD = 1
+    NEW = 2
+
+
+@dataclass(frozen=True)
+class BookMatch:
+    name: str
+    number: Optional[int]
+    confidence: float
+    book: Optional[str] = None
+
+
+def fold_accents(name: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def name_tokens(name: str) -> list:
+    name = ORDINAL_NUMBER.sub(lambda m: m.group(0)[0], fold_accents(name).lower())
+    tokens = NAME_TOKEN.findall(name)
+    if len(tokens) > 1:
+        first = tokens[0]
+        tokens[0] = ORDINAL_WORDS.get(first, ROMAN_NUMERALS.get(first, first))
+    return tokens
+
+
+@lru_cache(maxsize=None)
+def available_languages() -> dict:
+    with open(CATALOG_DIR / "index.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_catalog(language: str) -> list:
+    with open(CATALOG_DIR / f"{language}.json", "r", encoding="utf-8") as f:
+        return json.load(f)["books"]
+
+
+class BookResolver:
+    TERMINAL = ""
+
+    def __init__(self, trie: dict, book_names: dict):
+        self._trie = trie
+        self.book_names = book_names
+
+    @classmethod
+    def build(cls, catalogs: list) -> "BookResolver":
+        # Catalogs are in priority order. They are inserted last to first so
+        # an alias shared between languages resolves like the first one.
+        trie = dict()
+        book_names = dict()
+        for books in reversed(catalogs):
+            for book_data in books:
+                book_names[book_data["number"]] = book_data["name"]
+                for alias in [book_data["name"]] + book_data["abbreviations"]:
+                    node = trie
+                    for char in "".join(name_tokens(alias)):
+                        node = node.setdefault(char, dict())
+                    node[cls.TERMINAL] = book_data["number"]
+        return cls(trie, book_names)
+
+    def _walk(self, tokens: list) -> tuple:
+        # One pass over the key: returns the exact match, if any, and the
+        # longest alias that ends on a token boundary.
+        boundaries = set()
+        length = 0
+        for token in tokens:
+            length += len(token)
+            boundaries.add(length)
+
+        node = self._trie
+        prefix = (0, None)
+        for position, char in enumerate("".join(tokens), start=1):
+            node = node.get(char)
+            if node is None:
+                return None, prefix
+            if self.TERMINAL in node and position in boundaries:
+                prefix = (position, node[self.TERMINAL])
+        return node.get(self.TERMINAL), prefix
+
+    def _candidates(self, tokens: list):
+        yield tokens, 1.0
+        match = ATTACHED_ROMAN_NUMERAL.match(tokens[0]) if tokens else None
+        if match is not None:
+            yield [ROMAN_NUMERALS[match.group(1)], match.group(2)] + tokens[1:], 0.9
+        start, end = 0, len(tokens)
+        while start < end - 1 and tokens[start].isdigit():
+            start += 1
+            yield tokens[start:], 0.9
+        while end > start + 1 and tokens[end - 1].isdigit():
+            end -= 1
+            yield tokens[start:end], 0.9
+        last = tokens[end - 1] if end > start else ""
+        if len(last) > 3 and last.endswith("s"):
+            stripped = start > 0 or end < len(tokens)
+            yield tokens[start : end - 1] + [last[:-1]], 0.9 if stripped else 0.95
+
+    def resolve(self, name: str) -> BookMatch:
+        best = BookMatch(name, None, 0.0)
+        variants = [(name, 1.0)]
+        without_parentheticals = PARENTHETICAL.sub(" ", name)
+        if without_parentheticals != name:
+            variants.append((without_parentheticals, 0.9))
+
+        for variant, variant_confidence in variants:
+            for tokens, confidence in self._candidates(name_tokens(variant)):
+                if len(tokens) <= 0:
+                    continue
+                confidence = min(confidence, variant_confidence)
+                number, (prefix_length, prefix_number) = self._walk(tokens)
+                if number is None and prefix_number is not None:
+                    key_length = sum(len(t) for t in tokens)
+                    number = prefix_number
+                    confidence = min(confidence, 0.5 + 0.4 * prefix_length / key_length)
+                if number is not None and confidence > best.confidence:
+                    best = BookMatch(name, number, confidence, self.book_names[number])
+                    if confidence >= 1.0:
+                        return best
+        return best
+
+    def resolve_many(self, names) -> dict:
+        return {name: self.resolve(name) for name in dict.fromkeys(names)}
+
+
+@lru_cache(maxsize=8)
+def catalog_fingerprint(languages: tuple) -> str:
+    # Hashes the catalogs themselves: the packaged app unpacks them afresh
+    # on every launch, so their mtimes change while the content doesn't.
+    fingerprint = hashlib.sha256(str(INDEX_VERSION).encode())
+    for language in languages:
+        fingerprint.update(f"{language}\0".encode())
+        fingerprint.update((CATALOG_DIR / f"{language}.json").read_bytes())
+    return fingerprint.hexdigest()[:16]
+
+
+def index_cache_path(languages: tuple) -> Path:
+    return user_cache_dir() / f"books-{catalog_fingerprint(languages)}.pickle"
+
+
+@lru_cache(maxsize=8)
+def book_resolver(languages: tuple = DEFAULT_LANGUAGES) -> BookResolver:
+    cache_path = index_cache_path(languages)
+    try:
+        with open(cache_path, "rb") as f:
+            return BookResolver(*pickle.load(f))
+    except (OSError, EOFError, pickle.UnpicklingError, TypeError, ValueError):
+        pass
+
+    resolver = BookResolver.build([load_catalog(language) for language in languages])
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((resolver._trie, resolver.book_names), f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return resolver
+
+
+def section_book_number(book_num: Optional[int], section=BibleSection.FULL):
+    if book_num is None:
+        return None
+    if section == BibleSection.NEW and book_num < 40:
+        return None
+    if section == BibleSection.OLD and book_num >= 40:
+        return None
+    return (
+        book_num
+        if section in (BibleSection.FULL, BibleSection.OLD)
+        else (book_num - 40) + 1
+    )
+
+
+def get_bible_book_number(
+    book: str,
+    section=BibleSection.FULL,
+    min_confidence: float = MIN_BOOK_CONFIDENCE,
+    languages: tuple = DEFAULT_LANGUAGES,
+):
+    match = book_resolver(languages).resolve(book)
+    if match.confidence < min_confidence:
+        return None
+    return section_book_number(match.number, section)
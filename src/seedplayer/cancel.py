@@ -0,0 +1,23 @@
+import threading
+
+
+class ExportCancelled(Exception):
+    def __init__(self, completed=()):
+        super().__init__("Export cancelled")
+        self.completed = list(completed)
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise ExportCancelled()
@@ -0,0 +1,410 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from .books import DEFAULT_LANGUAGES, available_languages
+from .cancel import CancellationToken
+from .copier import CopyBackend, CopyOptions, SyncMode, VerifyMode
+from .drives import DEFAULT_COPY_WORKERS
+from .export import (
+    CONTENT_TYPES,
+    compare_copy_backends,
+    execute_export_plan,
+    timed_plan,
+)
+from .fanout import fan_out_plan
+from .instrument import (
+    PROFILE_ENV,
+    ExportMetrics,
+    instrumented_run,
+    profiling_requested,
+)
+from .library import source_library
+from .plan import ExportPlan
+from .preflight import PreflightReport, preflight_export
+from .progress import ExportProgress, format_bytes, format_duration
+from .watch import watch_export
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="seedplayer-export",
+        description="Export audio content into a SeedPlayer folder layout.",
+    )
+    parser.add_argument(
+        "src", metavar="SRC", help="source content folder or .zip/.tar archive"
+    )
+    parser.add_argument("dst", metavar="DST", help="destination drive or folder")
+    parser.add_argument(
+        "--also",
+        metavar="DST",
+        action="append",
+        default=[],
+        help="also export to this destination, reading the source once",
+    )
+    parser.add_argument(
+        "--type",
+        dest="content_type",
+        choices=CONTENT_TYPES,
+        default="Bible",
+        help="content type (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--name", default="01", help="destination folder name (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--language",
+        dest="languages",
+        action="append",
+        choices=sorted(available_languages()),
+        help="book name catalog, repeat for more (default: en)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_COPY_WORKERS,
+        help="concurrent copies (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only copy files that changed since the last export",
+    )
+    parser.add_argument(
+        "--hash",
+        dest="use_hash",
+        action="store_true",
+        help="compare file hashes when exporting incrementally",
+    )
+    parser.add_argument(
+        "--probe", action="store_true", help="test the destination write speed first"
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="scan the whole source again instead of trusting the library index, "
+        "e.g. after files were rewritten in place",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=[b.value for b in CopyBackend],
+        default=CopyBackend.FAST.value,
+        help="copy backend (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-metadata",
+        dest="preserve_metadata",
+        action="store_false",
+        help="do not copy timestamps and permissions",
+    )
+    parser.add_argument(
+        "--strip-tags",
+        action="store_true",
+        help="leave ID3 tags and cover art out of the exported files",
+    )
+    parser.add_argument(
+        "--sync",
+        choices=[m.value for m in SyncMode],
+        default=SyncMode.NEVER.value,
+        help="when to flush writes to the device (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--verify",
+        choices=[m.value for m in VerifyMode],
+        default=VerifyMode.NEVER.value,
+        help="read the copied files back and compare them with the source, "
+        "optionally rewriting any that differ (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and sync DST incrementally whenever SRC changes",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="print the export plan and exit"
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="compare the copy backend against copy2 on the destination and exit",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="sample a profile of the run and save it next to the run log "
+        f"(or set {PROFILE_ENV}=1)",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+    return parser
+
+
+def print_plan(plan: ExportPlan, preflight: Optional[PreflightReport]):
+    for planned_file in plan.files:
+        print(f"{planned_file.src} -> {planned_file.dst}")
+    print(
+        f"{len(plan.files)} files, {format_bytes(plan.total_bytes)} "
+        f"to {plan.root_path}"
+    )
+    for warning in plan.warnings:
+        print(warning)
+    if preflight is not None:
+        print(
+            f"needs {format_bytes(preflight.required_bytes)}, "
+            f"{format_bytes(preflight.free_bytes)} free"
+        )
+        for warning in preflight.warnings:
+            print(warning)
+
+
+def report_progress(progresses: dict, done: threading.Event):
+    while not done.wait(1.0):
+        snapshots = [p.snapshot() for p in progresses.values()]
+        if any(s.total_files <= 0 for s in snapshots):
+            continue
+        if len(snapshots) == 1:
+            snapshot = snapshots[0]
+            eta = (
+                format_duration(snapshot.eta) if snapshot.eta is not None else "--:--"
+            )
+            line = (
+                f"{snapshot.files_done}/{snapshot.total_files} files, "
+                f"{format_bytes(snapshot.bytes_done)} of "
+                f"{format_bytes(snapshot.total_bytes)} at "
+                f"{snapshot.rate / (1024 * 1024):.1f} MB/s, ETA {eta}"
+            )
+        else:
+            line = " | ".join(
+                f"{label} {snapshot.fraction:.0%} "
+                f"{snapshot.rate / (1024 * 1024):.1f} MB/s"
+                for label, snapshot in zip(progresses, snapshots)
+            )
+        print(f"\r{line}  ", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+
+def start_reporter(progresses: dict, quiet: bool) -> tuple:
+    done = threading.Event()
+    reporter = None
+    if not quiet:
+        reporter = threading.Thread(
+            target=report_progress, args=(progresses, done), daemon=True
+        )
+        reporter.start()
+    return done, reporter
+
+
+def stop_reporter(done: threading.Event, reporter: Optional[threading.Thread]):
+    done.set()
+    if reporter is not None:
+        reporter.join()
+
+
+@contextmanager
+def interrupt_cancels():
+    # Ctrl+C stops the export cooperatively so partial files are cleaned up
+    # and the manifest records what was finished.
+    cancel = CancellationToken()
+    previous = signal.signal(signal.SIGINT, lambda signum, frame: cancel.cancel())
+    try:
+        yield cancel
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def report_verification(result, label: str = "") -> bool:
+    # Prints the verification outcome and returns whether every file matched.
+    if result.verified <= 0 and len(result.mismatched) <= 0:
+        return True
+    print(
+        f"{label}{result.verified} verified, {result.rewritten} rewritten, "
+        f"{len(result.mismatched)} mismatched"
+    )
+    for relative_path in result.mismatched:
+        print(
+            f"error: {label}{relative_path} does not match the source",
+            file=sys.stderr,
+        )
+    return len(result.mismatched) <= 0
+
+
+def fan_out(args, plan: ExportPlan, copy_options: CopyOptions) -> int:
+    dst_directories = list(dict.fromkeys([args.dst] + args.also))
+    progresses = {d: ExportProgress() for d in dst_directories}
+    done, reporter = start_reporter(progresses, args.quiet)
+    try:
+        with interrupt_cancels() as cancel:
+            results = fan_out_plan(
+                plan,
+                dst_directories,
+                args.incremental,
+                args.use_hash,
+                progresses,
+                copy_options,
+                args.probe,
+                cancel,
+            )
+    finally:
+        stop_reporter(done, reporter)
+
+    failed = 0
+    for dst_directory, result in results.items():
+        if result.error is not None:
+            print(f"error: {dst_directory}: {result.error}", file=sys.stderr)
+            failed += 1
+        elif result.cancelled:
+            print(f"{dst_directory}: cancelled, {result.copied} copied")
+            failed += 1
+        else:
+            print(
+                f"{dst_directory}: {result.copied} copied, "
+                f"{result.skipped} unchanged, {result.removed} removed"
+            )
+            if not report_verification(result, f"{dst_directory}: "):
+                failed += 1
+    return 1 if failed > 0 else 0
+
+
+def watch(args, copy_options: CopyOptions, languages: tuple) -> int:
+    def on_sync(result, error):
+        stamp = time.strftime("%H:%M:%S")
+        if error is not None:
+            print(f"{stamp} error: {error}", file=sys.stderr)
+        elif result.cancelled:
+            print(f"{stamp} cancelled, {result.copied} copied")
+        else:
+            print(
+                f"{stamp} {result.copied} copied, {result.skipped} unchanged, "
+                f"{result.removed} removed"
+            )
+            report_verification(result)
+
+    print(f"watching {args.src}, press Ctrl+C to stop", file=sys.stderr)
+    with interrupt_cancels() as cancel:
+        try:
+            watch_export(
+                args.content_type,
+                args.src,
+                args.dst,
+                args.name,
+                args.workers,
+                args.use_hash,
+                None,
+                copy_options,
+                languages,
+                cancel,
+                on_sync,
+            )
+        except ValueError as ex:
+            print(f"error: {ex}", file=sys.stderr)
+            return 1
+    return 0
+
+
+def run(args, metrics: ExportMetrics) -> int:
+    copy_options = CopyOptions(
+        backend=CopyBackend(args.backend),
+        preserve_metadata=args.preserve_metadata,
+        sync_mode=SyncMode(args.sync),
+        strip_tags=args.strip_tags,
+        verify=VerifyMode(args.verify),
+    )
+
+    languages = tuple(args.languages or DEFAULT_LANGUAGES)
+    if args.rescan:
+        source_library.forget(args.src)
+    if args.watch:
+        if len(args.also) > 0 or args.dry_run or args.compare:
+            print(
+                "error: --watch cannot be combined with --also, --dry-run "
+                "or --compare",
+                file=sys.stderr,
+            )
+            return 1
+        return watch(args, copy_options, languages)
+    try:
+        plan = timed_plan(
+            args.content_type, args.src, args.dst, args.name, languages, metrics
+        )
+    except OSError as ex:
+        metrics.error = str(ex)
+        print(f"error: cannot read the source: {ex}", file=sys.stderr)
+        return 1
+    preflight = None
+    if len(plan.errors) <= 0:
+        with metrics.phase("preflight"):
+            preflight = preflight_export(plan, args.probe)
+    errors = plan.errors + (preflight.errors if preflight is not None else [])
+    if len(errors) > 0:
+        metrics.error = "; ".join(errors)
+
+    if args.dry_run:
+        print_plan(plan, preflight)
+    for error in errors:
+        print(f"error: {error}", file=sys.stderr)
+    if args.dry_run or len(errors) > 0:
+        return 1 if len(errors) > 0 else 0
+
+    if args.compare:
+        for result in compare_copy_backends(plan, copy_options, args.workers):
+            print(
+                f"{result['backend']}: {result['files']} files, "
+                f"{format_bytes(result['bytes'])} in {result['seconds']:.2f}s, "
+                f"{result['rate'] / (1024 * 1024):.1f} MB/s"
+            )
+        return 0
+
+    if len(args.also) > 0:
+        return fan_out(args, plan, copy_options)
+
+    progress = ExportProgress()
+    done, reporter = start_reporter({args.dst: progress}, args.quiet)
+    try:
+        with interrupt_cancels() as cancel:
+            result = execute_export_plan(
+                plan,
+                args.workers,
+                args.incremental,
+                args.use_hash,
+                progress,
+                copy_options,
+                metrics,
+                cancel,
+            )
+    except OSError as ex:
+        metrics.error = str(ex)
+        print(f"error: {ex}", file=sys.stderr)
+        return 1
+    finally:
+        stop_reporter(done, reporter)
+
+    if result.cancelled:
+        metrics.error = "cancelled"
+        print(f"cancelled, {result.copied} copied")
+        return 1
+    print(
+        f"{result.copied} copied, {result.skipped} unchanged, "
+        f"{result.removed} removed"
+    )
+    return 0 if report_verification(result) else 1
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = build_parser().parse_args(argv)
+    details = {
+        "content_type": args.content_type,
+        "source": args.src,
+        "destination": os.path.join(args.dst, args.name),
+    }
+    profile = args.profile or profiling_requested()
+    with instrumented_run("cli", profile, details) as metrics:
+        status = run(args, metrics)
+    if profile and metrics.log_path is not None:
+        print(f"run log: {metrics.log_path}", file=sys.stderr)
+    return status
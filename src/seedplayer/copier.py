@@ -0,0 +1,279 @@
+import errno
+import mmap
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from shutil import copy2, copystat
+from typing import Callable, Optional
+
+from .cancel import CancellationToken, ExportCancelled
+from .drives import DEFAULT_COPY_WORKERS
+from .instrument import ExportMetrics, timed_phase
+from .progress import ExportProgress
+from .tags import audio_range
+
+
+class CopyBackend(Enum):
+    FAST = "fast"
+    COPY2 = "copy2"
+
+
+class SyncMode(Enum):
+    NEVER = "never"
+    DIRECTORY = "directory"
+    FILE = "file"
+
+
+class VerifyMode(Enum):
+    NEVER = "never"
+    REPORT = "report"
+    REWRITE = "rewrite"
+
+
+@dataclass
+class CopyOptions:
+    backend: CopyBackend = CopyBackend.FAST
+    preserve_metadata: bool = True
+    sync_mode: SyncMode = SyncMode.NEVER
+    buffer_size: int = 4 * 1024 * 1024
+    strip_tags: bool = False
+    verify: VerifyMode = VerifyMode.NEVER
+
+
+KERNEL_COPY_CHUNK_SIZE = 8 * 1024 * 1024
+KERNEL_COPY_FALLBACK_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+_copy_buffers = threading.local()
+
+
+def copy_buffer(size: int) -> mmap.mmap:
+    # Anonymous maps are page aligned, which keeps reads and writes on
+    # flash erase-block friendly boundaries.
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None or len(buffer) != size:
+        buffer = mmap.mmap(-1, size)
+        _copy_buffers.buffer = buffer
+    return buffer
+
+
+def kernel_copy(
+    copy_range: Callable,
+    infd: int,
+    outfd: int,
+    start: int,
+    length: int,
+    progress: Optional[ExportProgress],
+    cancel: Optional[CancellationToken] = None,
+) -> bool:
+    copied = 0
+    while copied < length:
+        if cancel is not None:
+            cancel.check()
+        count = min(KERNEL_COPY_CHUNK_SIZE, length - copied)
+        try:
+            sent = copy_range(infd, outfd, start + copied, count)
+        except OSError as ex:
+            if copied == 0 and ex.errno in KERNEL_COPY_FALLBACK_ERRORS:
+                return False
+            raise
+        if sent == 0:
+            break
+        copied += sent
+        if progress is not None:
+            progress.add_bytes(sent)
+    return True
+
+
+def buffered_copy(
+    fsrc,
+    fdst,
+    buffer_size: int,
+    length: int,
+    progress: Optional[ExportProgress],
+    cancel: Optional[CancellationToken] = None,
+):
+    remaining = length
+    with memoryview(copy_buffer(buffer_size)) as view:
+        while remaining > 0 and (count := fsrc.readinto(view[:remaining])):
+            if cancel is not None:
+                cancel.check()
+            chunk = view[:count]
+            while len(chunk) > 0:
+                chunk = chunk[fdst.write(chunk) :]
+            remaining -= count
+            if progress is not None:
+                progress.add_bytes(count)
+
+
+def copy_file_fast(
+    src: Path,
+    dst: Path,
+    options: CopyOptions,
+    progress: Optional[ExportProgress],
+    metrics: Optional[ExportMetrics] = None,
+    cancel: Optional[CancellationToken] = None,
+):
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(infd).st_size
+        start, end = audio_range(fsrc) if options.strip_tags else (0, size)
+        if progress is not None and end - start < size:
+            progress.skip_bytes(size - (end - start))
+        copied = hasattr(os, "copy_file_range") and kernel_copy(
+            lambda i, o, offset, count: os.copy_file_range(i, o, count, offset),
+            infd,
+            outfd,
+            start,
+            end - start,
+            progress,
+            cancel,
+        )
+        if not copied and sys.platform.startswith("linux"):
+            copied = kernel_copy(
+                lambda i, o, offset, count: os.sendfile(o, i, offset, count),
+                infd,
+                outfd,
+                start,
+                end - start,
+                progress,
+                cancel,
+            )
+        if not copied:
+            fsrc.seek(start)
+            buffered_copy(
+                fsrc, fdst, options.buffer_size, end - start, progress, cancel
+            )
+        if options.sync_mode == SyncMode.FILE:
+            with timed_phase(metrics, "fsync"):
+                os.fsync(outfd)
+    if options.preserve_metadata:
+        copystat(src, dst)
+
+
+def fsync_path(path, directory: bool = False):
+    # Windows needs write access to flush a file; elsewhere read-only is
+    # enough and also works for directories.
+    flags = os.O_RDWR if os.name == "nt" and not directory else os.O_RDONLY
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_files(files: list):
+    # Flushes only these files and the folders holding them, so syncing one
+    # card doesn't wait for the dirty pages of every other device.
+    try:
+        for file in files:
+            fsync_path(file)
+    except OSError:
+        if not hasattr(os, "sync"):
+            raise
+        os.sync()
+        return
+    if os.name == "nt":
+        return
+    for directory in {Path(f).parent for f in files}:
+        try:
+            fsync_path(directory, directory=True)
+        except OSError:
+            # Some filesystems can't flush a directory; the entries are
+            # written with the files on those.
+            pass
+
+
+class DirectorySync:
+    def __init__(self, copy_jobs: list):
+        self._lock = threading.Lock()
+        self._pending = Counter(Path(dst).parent for _, dst in copy_jobs)
+        self._finished = dict()
+
+    def file_done(self, dst: Path):
+        directory = Path(dst).parent
+        with self._lock:
+            self._finished.setdefault(directory, []).append(dst)
+            self._pending[directory] -= 1
+            if self._pending[directory] > 0:
+                return
+            files = self._finished.pop(directory)
+        sync_files(files)
+
+
+def copy_file(
+    src: Path,
+    dst: Path,
+    progress: Optional[ExportProgress] = None,
+    options: Optional[CopyOptions] = None,
+    directory_sync: Optional[DirectorySync] = None,
+    metrics: Optional[ExportMetrics] = None,
+    cancel: Optional[CancellationToken] = None,
+):
+    if options is None:
+        options = CopyOptions()
+    if cancel is not None:
+        cancel.check()
+    started = time.perf_counter()
+    try:
+        if options.backend == CopyBackend.COPY2 and not options.strip_tags:
+            copy2(src, dst)
+            if progress is not None:
+                progress.add_bytes(os.path.getsize(dst))
+        else:
+            copy_file_fast(src, dst, options, progress, metrics, cancel)
+    except ExportCancelled:
+        Path(dst).unlink(missing_ok=True)
+        raise
+    if metrics is not None:
+        metrics.file_done(src, os.path.getsize(dst), time.perf_counter() - started)
+    if directory_sync is not None:
+        with timed_phase(metrics, "directory_sync"):
+            directory_sync.file_done(dst)
+    if progress is not None:
+        progress.file_done()
+
+
+def copy_files(
+    copy_jobs: list,
+    workers: int = DEFAULT_COPY_WORKERS,
+    progress: Optional[ExportProgress] = None,
+    options: Optional[CopyOptions] = None,
+    metrics: Optional[ExportMetrics] = None,
+    cancel: Optional[CancellationToken] = None,
+):
+    directory_sync = None
+    if options is not None and options.sync_mode == SyncMode.DIRECTORY:
+        directory_sync = DirectorySync(copy_jobs)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(
+                copy_file, src, dst, progress, options, directory_sync, metrics, cancel
+            ): dst
+            for src, dst in copy_jobs
+        }
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is None:
+                continue
+            executor.shutdown(wait=True, cancel_futures=True)
+            if isinstance(future.exception(), ExportCancelled):
+                raise ExportCancelled(
+                    dst
+                    for f, dst in futures.items()
+                    if f.done() and not f.cancelled() and f.exception() is None
+                )
+            raise future.exception()
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+
+def home_directory() -> str:
+    return os.path.expanduser("~")
+
+
+PSEUDO_FILESYSTEMS = {
+    "autofs",
+    "binfmt_misc",
+    "bpf",
+    "cgroup",
+    "cgroup2",
+    "configfs",
+    "debugfs",
+    "devfs",
+    "devpts",
+    "devtmpfs",
+    "efivarfs",
+    "fuse.gvfsd-fuse",
+    "fuse.portal",
+    "fusectl",
+    "hugetlbfs",
+    "mqueue",
+    "nsfs",
+    "overlay",
+    "proc",
+    "pstore",
+    "ramfs",
+    "rpc_pipefs",
+    "securityfs",
+    "selinuxfs",
+    "squashfs",
+    "sysfs",
+    "tmpfs",
+    "tracefs",
+}
+
+
+class DriveRegistry:
+    def __init__(self, poll_interval: float = 2.0, include_pseudo: bool = False):
+        self.poll_interval = poll_interval
+        self.include_pseudo = include_pseudo
+        self.version = 0
+        self._lock = threading.Lock()
+        self._partitions = None
+        self._listeners = []
+        self._poller = None
+
+    def include(self, partition) -> bool:
+        if partition.fstype == "":
+            return False
+        if self.include_pseudo:
+            return True
+        if partition.device.startswith("/dev/loop"):
+            return False
+        return partition.fstype not in PSEUDO_FILESYSTEMS
+
+    def refresh(self) -> bool:
+        import psutil
+
+        partitions = [p for p in psutil.disk_partitions(all=True) if self.include(p)]
+        mountpoints = [p.mountpoint for p in partitions]
+        with self._lock:
+            previous = self._partitions or []
+            if self._partitions is not None and mountpoints == [
+                p.mountpoint for p in previous
+            ]:
+                return False
+            self._partitions = partitions
+            self.version += 1
+            listeners = list(self._listeners)
+
+        previous_mounts = {p.mountpoint for p in previous}
+        added = [p for p in partitions if p.mountpoint not in previous_mounts]
+        removed = [p for p in previous if p.mountpoint not in mountpoints]
+        for listener in listeners:
+            listener(added, removed)
+        return True
+
+    def partitions(self) -> list:
+        if self._partitions is None:
+            self.refresh()
+        return self._partitions
+
+    def drives(self) -> dict:
+        return {
+            partition.mountpoint: partition.device.replace("\\", "")
+            for partition in self.partitions()
+        }
+
+    def subscribe(self, listener: Callable):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def start(self):
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(
+                target=self._poll, name="drive-registry", daemon=True
+            )
+        self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh()
+            except Exception:
+                continue
+
+
+drive_registry = DriveRegistry()
+
+
+def connected_drives() -> dict:
+    return drive_registry.drives()
+
+
+def home_drive():
+    home = home_directory()
+    partitions = [
+        p for p in drive_registry.partitions() if home.startswith(p.mountpoint)
+    ]
+    if len(partitions) <= 0:
+        return None
+    return max(partitions, key=lambda p: len(p.mountpoint))
+
+
+def destination_device(path: str) -> Optional[str]:
+    drives = connected_drives()
+    mountpoints = [m for m in drives if path.startswith(m)]
+    if len(mountpoints) <= 0:
+        return None
+    return drives[max(mountpoints, key=len)]
+
+
+DEFAULT_COPY_WORKERS = 4
+device_copy_workers = dict()
+
+
+def copy_workers_for(path: str) -> int:
+    return device_copy_workers.get(destination_device(path), DEFAULT_COPY_WORKERS)
@@ -0,0 +1,310 @@
+import os
+import time
+from dataclasses import dataclass, field
+from shutil import rmtree
+from typing import Optional
+
+from .archives import copy_archive_members
+from .books import DEFAULT_LANGUAGES
+from .cancel import CancellationToken, ExportCancelled
+from .copier import CopyBackend, CopyOptions, VerifyMode, copy_files, sync_files
+from .drives import DEFAULT_COPY_WORKERS, copy_workers_for
+from .instrument import ExportMetrics, instrumented_run, timed_phase
+from .library import scan_content
+from .manifest import (
+    is_unchanged,
+    manifest_entry,
+    read_manifest,
+    remove_stale_files,
+    write_manifest,
+)
+from .plan import ExportPlan, plan_export
+from .preflight import preflight_export
+from .progress import ExportProgress
+from .scan import count_directories
+from .verify import verify_export
+
+CONTENT_TYPES = ["Bible", "Old Testament", "New Testament", "Other"]
+
+
+@dataclass
+class ExportResult:
+    copied: int = 0
+    skipped: int = 0
+    removed: int = 0
+    error: Optional[str] = None
+    cancelled: bool = False
+    verified: int = 0
+    mismatched: list = field(default_factory=list)
+    rewritten: int = 0
+
+
+def manifest_entries(plan: ExportPlan, use_hash: bool, strip_tags: bool) -> dict:
+    # Members of an archive can't be hashed without a second full read of
+    # it, so those exports compare size and modification time only.
+    use_hash = use_hash and plan.archive is None
+    return {
+        plan.relative_path(f.dst): manifest_entry(f, use_hash, strip_tags)
+        for f in plan.files
+    }
+
+
+def prepare_target(
+    plan: ExportPlan, entries: dict, incremental: bool, result: ExportResult
+) -> list:
+    for directory in plan.directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    previous_entries = read_manifest(plan.root_path)
+    pending = []
+    for planned_file in plan.files:
+        relative_path = plan.relative_path(planned_file.dst)
+        previous = previous_entries.get(relative_path)
+        if incremental and is_unchanged(
+            planned_file, entries[relative_path], previous
+        ):
+            entries[relative_path]["dst_size"] = previous["dst_size"]
+            result.skipped += 1
+        else:
+            pending.append(planned_file)
+
+    # An empty plan means the source went missing, not that the card should
+    # be emptied.
+    if len(plan.files) > 0:
+        stale = [p for p in previous_entries if p not in entries]
+        result.removed = remove_stale_files(plan.root_path, stale)
+    return pending
+
+
+def finish_target(
+    plan: ExportPlan, pending: list, entries: dict, completed: Optional[set] = None
+):
+    # After a cancel only the completed files are recorded, so the next
+    # incremental export picks up the rest.
+    for planned_file in pending:
+        relative_path = plan.relative_path(planned_file.dst)
+        if completed is not None and planned_file.dst not in completed:
+            del entries[relative_path]
+            continue
+        entries[relative_path]["dst_size"] = planned_file.dst.stat().st_size
+    write_manifest(plan.root_path, entries)
+
+
+def verify_target(
+    plan: ExportPlan,
+    pending: list,
+    entries: dict,
+    copy_options: CopyOptions,
+    workers: int,
+    progress: Optional[ExportProgress],
+    cancel: Optional[CancellationToken],
+    result: ExportResult,
+    sources=None,
+) -> Optional[set]:
+    # Returns the files to record in the manifest, leaving out any that
+    # still don't match so the next incremental export copies them again.
+    if copy_options.verify == VerifyMode.NEVER or len(pending) <= 0:
+        return None
+    try:
+        check = verify_export(
+            plan, pending, copy_options, entries, workers, progress, cancel, sources
+        )
+    except ExportCancelled:
+        result.cancelled = True
+        return None
+    result.verified = check.verified
+    result.rewritten = check.rewritten
+    result.mismatched = [plan.relative_path(f.dst) for f in check.mismatched]
+    if len(check.mismatched) <= 0:
+        return None
+    return {f.dst for f in pending} - {f.dst for f in check.mismatched}
+
+
+def execute_export_plan(
+    plan: ExportPlan,
+    workers: Optional[int] = None,
+    incremental: bool = False,
+    use_hash: bool = False,
+    progress: Optional[ExportProgress] = None,
+    copy_options: Optional[CopyOptions] = None,
+    metrics: Optional[ExportMetrics] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> ExportResult:
+    if len(plan.errors) > 0:
+        raise ValueError("; ".join(plan.errors))
+
+    if workers is None:
+        workers = copy_workers_for(str(plan.root_path))
+    strip_tags = copy_options is not None and copy_options.strip_tags
+    result = ExportResult()
+    with timed_phase(metrics, "manifest"):
+        entries = manifest_entries(plan, use_hash, strip_tags)
+    with timed_phase(metrics, "prepare"):
+        pending = prepare_target(plan, entries, incremental, result)
+
+    if progress is not None:
+        progress.start(len(pending), sum(f.size for f in pending))
+    completed = None
+    with timed_phase(metrics, "copy"):
+        try:
+            if plan.archive is not None:
+                copy_archive_members(
+                    plan.archive,
+                    [(f.src, f.dst) for f in pending],
+                    progress,
+                    copy_options,
+                    metrics,
+                    cancel,
+                )
+            else:
+                copy_files(
+                    [(f.src, f.dst) for f in pending],
+                    workers,
+                    progress,
+                    copy_options,
+                    metrics,
+                    cancel,
+                )
+        except ExportCancelled as ex:
+            completed = set(ex.completed)
+            result.cancelled = True
+    result.copied = len(pending) if completed is None else len(completed)
+    if completed is None and copy_options is not None:
+        with timed_phase(metrics, "verify"):
+            completed = verify_target(
+                plan, pending, entries, copy_options, workers, progress, cancel, result
+            )
+    with timed_phase(metrics, "finish"):
+        finish_target(plan, pending, entries, completed)
+    if metrics is not None:
+        metrics.count("directories", len(plan.directories))
+        metrics.count("skipped", result.skipped)
+        metrics.count("removed", result.removed)
+    return result
+
+
+def timed_plan(
+    content_type: str,
+    src_directory: str,
+    dst_directory: str,
+    dst_name: str = "01",
+    languages: tuple = DEFAULT_LANGUAGES,
+    metrics: Optional[ExportMetrics] = None,
+) -> ExportPlan:
+    with timed_phase(metrics, "scan"):
+        source = scan_content(src_directory)
+    if metrics is not None:
+        metrics.count("source_directories", count_directories(source))
+        metrics.count("source_files", source.total_files)
+        metrics.count("source_bytes", source.total_bytes)
+    with timed_phase(metrics, "plan"):
+        return plan_export(
+            content_type,
+            src_directory,
+            dst_directory,
+            dst_name,
+            source=source,
+            languages=languages,
+        )
+
+
+def handle_export_contents(
+    content_type: str,
+    src_directory: str,
+    dst_directory: str,
+    dst_name: str = "01",
+    workers: Optional[int] = None,
+    incremental: bool = False,
+    use_hash: bool = False,
+    progress: Optional[ExportProgress] = None,
+    copy_options: Optional[CopyOptions] = None,
+    probe_speed: bool = False,
+    languages: tuple = DEFAULT_LANGUAGES,
+    profile: Optional[bool] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> ExportResult:
+    details = {
+        "content_type": content_type,
+        "source": src_directory,
+        "destination": os.path.join(dst_directory, dst_name),
+    }
+    with instrumented_run("export", profile, details) as metrics:
+        plan = timed_plan(
+            content_type, src_directory, dst_directory, dst_name, languages, metrics
+        )
+        if len(plan.errors) <= 0:
+            with metrics.phase("preflight"):
+                preflight = preflight_export(plan, probe_speed)
+            if len(preflight.errors) > 0:
+                raise ValueError("; ".join(preflight.errors))
+        if cancel is not None and cancel.cancelled:
+            metrics.error = "cancelled"
+            return ExportResult(cancelled=True)
+        result = execute_export_plan(
+            plan,
+            workers,
+            incremental,
+            use_hash,
+            progress,
+            copy_options,
+            metrics,
+            cancel,
+        )
+        if result.cancelled:
+            metrics.error = "cancelled"
+        return result
+
+
+COMPARE_SAMPLE_BYTES = 64 * 1024 * 1024
+
+
+def compare_copy_backends(
+    plan: ExportPlan,
+    options: CopyOptions,
+    workers: int = DEFAULT_COPY_WORKERS,
+    sample_bytes: int = COMPARE_SAMPLE_BYTES,
+) -> list:
+    if plan.archive is not None:
+        raise ValueError("Copy backends can't be compared for an archive source")
+    sample = []
+    sample_total = 0
+    for planned_file in plan.files:
+        if sample_total >= sample_bytes:
+            break
+        sample.append(planned_file)
+        sample_total += planned_file.size
+
+    # Read the sample once up front so neither backend gets a warmer cache.
+    for planned_file in sample:
+        with open(planned_file.src, "rb") as f:
+            while f.read(options.buffer_size):
+                pass
+
+    benchmark_root = plan.root_path.parent / ".seedplayer-benchmark"
+    results = []
+    try:
+        for label, candidate in (
+            ("copy2", CopyOptions(backend=CopyBackend.COPY2)),
+            (options.backend.value, options),
+        ):
+            target = benchmark_root / label
+            target.mkdir(parents=True, exist_ok=True)
+            copy_jobs = [
+                (f.src, target / f"{index:05}.mp3") for index, f in enumerate(sample)
+            ]
+            started = time.perf_counter()
+            copy_files(copy_jobs, workers, options=candidate)
+            sync_files([dst for _, dst in copy_jobs])
+            elapsed = time.perf_counter() - started
+            results.append(
+                {
+                    "backend": label,
+                    "files": len(copy_jobs),
+                    "bytes": sample_total,
+                    "seconds": elapsed,
+                    "rate": sample_total / elapsed if elapsed > 0 else 0.0,
+                }
+            )
+    finally:
+        rmtree(benchmark_root, ignore_errors=True)
+    return results
@@ -0,0 +1,414 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copystat
+from typing import Optional
+
+from .books import DEFAULT_LANGUAGES
+from .cancel import CancellationToken, ExportCancelled
+from .copier import (
+    CopyOptions,
+    DirectorySync,
+    SyncMode,
+    VerifyMode,
+    buffered_copy,
+    copy_file,
+)
+from .drives import copy_workers_for
+from .export import (
+    ExportResult,
+    finish_target,
+    manifest_entries,
+    prepare_target,
+    verify_target,
+)
+from .plan import ExportPlan, plan_export
+from .preflight import preflight_export
+from .progress import ExportProgress
+from .tags import audio_range
+from .verify import VERIFY_WORKERS, source_digests
+
+FANOUT_CHUNK_SIZE = 1024 * 1024
+# A target more than this many chunks behind the reader stops being fed and
+# finishes the export reading the source on its own.
+FANOUT_QUEUE_CHUNKS = 32
+FANOUT_DONE = ("done",)
+
+
+class FanOutTarget:
+    def __init__(
+        self,
+        plan: ExportPlan,
+        pending: list,
+        progress: ExportProgress,
+        options: CopyOptions,
+        cancel: Optional[CancellationToken] = None,
+    ):
+        self.plan = plan
+        self.pending = pending
+        self.progress = progress
+        self.options = options
+        self.cancel = cancel
+        self.cancelled = False
+        self.error = None
+        self.detached = threading.Event()
+        self._queue = queue.Queue(maxsize=FANOUT_QUEUE_CHUNKS)
+        self._directory_sync = None
+        if options.sync_mode == SyncMode.DIRECTORY:
+            self._directory_sync = DirectorySync([(f.src, f.dst) for f in pending])
+        self._next = 0
+
+    @property
+    def fed(self) -> bool:
+        return not self.detached.is_set() and self.error is None
+
+    def feed(self, message: tuple) -> bool:
+        if not self.fed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self.detached.set()
+            return False
+        return True
+
+    @property
+    def completed(self) -> set:
+        return {f.dst for f in self.pending[: self._next]}
+
+    def run(self):
+        try:
+            self._write_fed_files()
+        except ExportCancelled:
+            self.cancelled = True
+            self.detached.set()
+        except BaseException as ex:
+            self.error = ex
+            self.detached.set()
+
+    def _write_fed_files(self):
+        fdst = None
+        written = 0
+        try:
+            while True:
+                try:
+                    message = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    if self.detached.is_set():
+                        break
+                    continue
+                if self.cancel is not None:
+                    self.cancel.check()
+                if message is FANOUT_DONE:
+                    return
+                if message[0] == "open":
+                    _, self._next, skipped = message
+                    fdst = open(self.pending[self._next].dst, "wb", buffering=0)
+                    written = 0
+                    if skipped > 0:
+                        self.progress.skip_bytes(skipped)
+                elif message[0] == "data":
+                    chunk = memoryview(message[1])
+                    while len(chunk) > 0:
+                        chunk = chunk[fdst.write(chunk) :]
+                    written += len(message[1])
+                    self.progress.add_bytes(len(message[1]))
+                else:
+                    self._finish_file(fdst)
+                    fdst = None
+                    self._next += 1
+
+            # Fell behind or the reader stopped: carry on from the source.
+            if fdst is not None:
+                self._resume_file(fdst, written)
+                self._finish_file(fdst)
+                fdst = None
+                self._next += 1
+            while self._next < len(self.pending):
+                planned_file = self.pending[self._next]
+                copy_file(
+                    planned_file.src,
+                    planned_file.dst,
+                    self.progress,
+                    self.options,
+                    self._directory_sync,
+                    cancel=self.cancel,
+                )
+                self._next += 1
+        except ExportCancelled:
+            if fdst is not None:
+                fdst.close()
+                fdst = None
+                self.pending[self._next].dst.unlink(missing_ok=True)
+            raise
+        finally:
+            if fdst is not None:
+                fdst.close()
+
+    def _resume_file(self, fdst, written: int):
+        planned_file = self.pending[self._next]
+        with open(planned_file.src, "rb", buffering=0) as fsrc:
+            size = os.fstat(fsrc.fileno()).st_size
+            start, end = audio_range(fsrc) if self.options.strip_tags else (0, size)
+            fsrc.seek(start + written)
+            buffered_copy(
+                fsrc,
+                fdst,
+                self.options.buffer_size,
+                end - start - written,
+                self.progress,
+                self.cancel,
+            )
+
+    def _finish_file(self, fdst):
+        planned_file = self.pending[self._next]
+        if self.options.sync_mode == SyncMode.FILE:
+            os.fsync(fdst.fileno())
+        fdst.close()
+        if self.options.preserve_metadata:
+            copystat(planned_file.src, planned_file.dst)
+        if self._directory_sync is not None:
+            self._directory_sync.file_done(planned_file.dst)
+        self.progress.file_done()
+
+
+def read_source(
+    files: list,
+    targets: list,
+    options: CopyOptions,
+    cancel: Optional[CancellationToken] = None,
+):
+    # Reads every planned file once and hands each chunk to the targets that
+    # still need the file and are keeping up.
+    positions = [
+        {f.dst.relative_to(t.plan.root_path): i for i, f in enumerate(t.pending)}
+        for t in targets
+    ]
+    try:
+        for planned_file, relative_path in files:
+            if cancel is not None and cancel.cancelled:
+                return
+            receivers = [
+                (target, position[relative_path])
+                for target, position in zip(targets, positions)
+                if relative_path in position and target.fed
+            ]
+            if len(receivers) <= 0:
+                continue
+            with open(planned_file.src, "rb", buffering=0) as fsrc:
+                size = os.fstat(fsrc.fileno()).st_size
+                start, end = audio_range(fsrc) if options.strip_tags else (0, size)
+                skipped = size - (end - start)
+                receivers = [
+                    target
+                    for target, index in receivers
+                    if target.feed(("open", index, skipped))
+                ]
+                fsrc.seek(start)
+                remaining = end - start
+                while remaining > 0 and len(receivers) > 0:
+                    if cancel is not None and cancel.cancelled:
+                        return
+                    chunk = fsrc.read(min(FANOUT_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    receivers = [t for t in receivers if t.feed(("data", chunk))]
+                for target in receivers:
+                    target.feed(("close",))
+        for target in targets:
+            target.feed(FANOUT_DONE)
+    except OSError:
+        # Each target retries from the source on its own below, so the
+        # error is reported per device instead of aborting all of them.
+        pass
+    finally:
+        # Anyone not told they are done reads the rest themselves.
+        for target in targets:
+            target.detached.set()
+
+
+def verify_targets(
+    base: ExportPlan,
+    targets: list,
+    copy_options: CopyOptions,
+    entries: dict,
+    cancel: Optional[CancellationToken] = None,
+) -> list:
+    # The sources are hashed once for all devices while every device is
+    # read back on its own thread.
+    completions = [None] * len(targets)
+    checked = [
+        index
+        for index, (target, _, _) in enumerate(targets)
+        if target.error is None and not target.cancelled
+    ]
+    needed = {
+        target.plan.relative_path(f.dst)
+        for target, _, _ in (targets[index] for index in checked)
+        for f in target.pending
+    }
+    files = [f for f in base.files if base.relative_path(f.dst) in needed]
+    if len(files) <= 0:
+        return completions
+
+    def verify(index: int) -> Optional[set]:
+        target, target_entries, result = targets[index]
+        return verify_target(
+            target.plan,
+            target.pending,
+            target_entries,
+            copy_options,
+            copy_workers_for(str(target.plan.root_path)),
+            target.progress,
+            cancel,
+            result,
+            sources,
+        )
+
+    with ThreadPoolExecutor(
+        max_workers=len(checked) + 1, thread_name_prefix="verify"
+    ) as executor:
+        sources = executor.submit(
+            source_digests,
+            base,
+            files,
+            copy_options.strip_tags,
+            entries,
+            VERIFY_WORKERS,
+            cancel,
+        )
+        for index, completed in zip(checked, executor.map(verify, checked)):
+            completions[index] = completed
+    return completions
+
+
+def execute_fan_out(
+    plans: list,
+    incremental: bool = False,
+    use_hash: bool = False,
+    progresses: Optional[list] = None,
+    copy_options: Optional[CopyOptions] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> list:
+    if copy_options is None:
+        copy_options = CopyOptions()
+    if progresses is None:
+        progresses = [ExportProgress() for _ in plans]
+    results = [ExportResult() for _ in plans]
+    if len(plans) <= 0:
+        return results
+
+    entries = manifest_entries(plans[0], use_hash, copy_options.strip_tags)
+    targets = []
+    for plan, progress, result in zip(plans, progresses, results):
+        target_entries = {path: dict(entry) for path, entry in entries.items()}
+        try:
+            pending = prepare_target(plan, target_entries, incremental, result)
+        except OSError as ex:
+            result.error = str(ex)
+            continue
+        progress.start(len(pending), sum(f.size for f in pending))
+        target = FanOutTarget(plan, pending, progress, copy_options, cancel)
+        targets.append((target, target_entries, result))
+
+    base = plans[0]
+    files = [(f, f.dst.relative_to(base.root_path)) for f in base.files]
+    with ThreadPoolExecutor(
+        max_workers=max(1, len(targets)), thread_name_prefix="fan-out"
+    ) as executor:
+        writers = [executor.submit(target.run) for target, _, _ in targets]
+        read_source(files, [target for target, _, _ in targets], copy_options, cancel)
+        for writer in writers:
+            writer.result()
+
+    completions = [None] * len(targets)
+    if copy_options.verify != VerifyMode.NEVER:
+        completions = verify_targets(base, targets, copy_options, entries, cancel)
+    for (target, target_entries, result), completed in zip(targets, completions):
+        if target.error is not None:
+            result.error = str(target.error)
+            continue
+        if target.cancelled:
+            completed = target.completed
+        finish_target(target.plan, target.pending, target_entries, completed)
+        result.copied = len(target.completed)
+        result.cancelled = result.cancelled or target.cancelled
+    return results
+
+
+def handle_fan_out_export(
+    content_type: str,
+    src_directory: str,
+    dst_directories: list,
+    dst_name: str = "01",
+    incremental: bool = False,
+    use_hash: bool = False,
+    progresses: Optional[dict] = None,
+    copy_options: Optional[CopyOptions] = None,
+    probe_speed: bool = False,
+    languages: tuple = DEFAULT_LANGUAGES,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    plan = plan_export(
+        content_type, src_directory, dst_directories[0], dst_name, languages=languages
+    )
+    return fan_out_plan(
+        plan,
+        dst_directories,
+        incremental,
+        use_hash,
+        progresses,
+        copy_options,
+        probe_speed,
+        cancel,
+    )
+
+
+def fan_out_plan(
+    plan: ExportPlan,
+    dst_directories: list,
+    incremental: bool = False,
+    use_hash: bool = False,
+    progresses: Optional[dict] = None,
+    copy_options: Optional[CopyOptions] = None,
+    probe_speed: bool = False,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    # The plan is for dst_directories[0] and is rebased onto the others.
+    if len(plan.errors) > 0:
+        raise ValueError("; ".join(plan.errors))
+    if plan.archive is not None:
+        raise ValueError("Archive sources can only be exported to one destination")
+    if progresses is None:
+        progresses = dict()
+
+    plans = [plan] + [plan.rebase(d) for d in dst_directories[1:]]
+    with ThreadPoolExecutor(max_workers=len(plans)) as executor:
+        preflights = list(
+            executor.map(lambda p: preflight_export(p, probe_speed), plans)
+        )
+
+    results = dict()
+    ready = []
+    for dst_directory, target_plan, preflight in zip(
+        dst_directories, plans, preflights
+    ):
+        results[dst_directory] = None
+        if len(preflight.errors) > 0:
+            results[dst_directory] = ExportResult(error="; ".join(preflight.errors))
+        else:
+            ready.append((dst_directory, target_plan))
+
+    ready_results = execute_fan_out(
+        [target_plan for _, target_plan in ready],
+        incremental,
+        use_hash,
+        [progresses.setdefault(d, ExportProgress()) for d, _ in ready],
+        copy_options,
+        cancel,
+    )
+    for (dst_directory, _), result in zip(ready, ready_results):
+        results[dst_directory] = result
+    return results
@@ -0,0 +1,210 @@
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .paths import user_data_dir
+
+PROFILE_ENV = "SEEDPLAYER_PROFILE"
+RUN_LOG_DIR = "runs"
+MAX_RUN_LOGS = 100
+SLOWEST_FILES = 10
+# Upper bounds in milliseconds for the per-file latency histogram.
+LATENCY_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+SAMPLE_INTERVAL = 0.005
+
+
+def profiling_requested() -> bool:
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+
+class ExportMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.finished = None
+        self.error = None
+        self.log_path = None
+        self.phases = dict()
+        self.counters = Counter()
+        self.latency = Counter()
+        self._slowest = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                seconds, calls = self.phases.get(name, (0.0, 0))
+                self.phases[name] = (seconds + elapsed, calls + 1)
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def file_done(self, path, size: int, seconds: float):
+        bucket = next(
+            (b for b in LATENCY_BUCKETS if seconds * 1000 <= b), LATENCY_BUCKETS[-1]
+        )
+        with self._lock:
+            self.counters["files"] += 1
+            self.counters["bytes"] += size
+            self.latency[bucket] += 1
+            entry = (seconds, str(path), size)
+            if len(self._slowest) < SLOWEST_FILES:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    def report(self) -> dict:
+        with self._lock:
+            finished = self.finished or time.time()
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(),
+                "seconds": finished - self.started,
+                "error": self.error,
+                "phases": {
+                    name: {"seconds": seconds, "calls": calls}
+                    for name, (seconds, calls) in self.phases.items()
+                },
+                "counters": dict(self.counters),
+                "latency_ms": {
+                    f"<={bucket}": self.latency[bucket] for bucket in LATENCY_BUCKETS
+                },
+                "slowest_files": [
+                    {"path": path, "size": size, "seconds": seconds}
+                    for seconds, path, size in sorted(self._slowest, reverse=True)
+                ],
+            }
+
+
+def timed_phase(metrics: Optional[ExportMetrics], name: str):
+    return metrics.phase(name) if metrics is not None else nullcontext()
+
+
+class SamplingProfiler:
+    # cProfile only sees the thread that enabled it, and the copies run on
+    # worker threads, so this samples the stacks of every thread instead.
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="export-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                        f"{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top_functions(self, count: int = 25) -> list:
+        own = Counter()
+        total = Counter()
+        for stack, hits in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += hits
+            for function in set(frames):
+                total[function] += hits
+        return [
+            {"function": function, "own": hits, "total": total[function]}
+            for function, hits in own.most_common(count)
+        ]
+
+    def write_folded(self, path: Path):
+        # One "frame;frame;frame count" line per stack, as flame graph
+        # tools expect.
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, hits in self.stacks.most_common():
+                f.write(f"{stack} {hits}\n")
+
+
+def run_log_dir() -> Path:
+    return user_data_dir() / RUN_LOG_DIR
+
+
+def write_run_log(
+    name: str,
+    metrics: ExportMetrics,
+    profiler: Optional[SamplingProfiler] = None,
+    details: Optional[dict] = None,
+) -> Optional[Path]:
+    directory = run_log_dir()
+    stamp = datetime.fromtimestamp(metrics.started).strftime("%Y%m%d-%H%M%S")
+    log_path = directory / f"{name}-{stamp}-{os.getpid()}.json"
+    report = dict(details or dict())
+    report.update(metrics.report())
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            profile_path = log_path.with_suffix(".folded")
+            profiler.write_folded(profile_path)
+            report["profile"] = {
+                "path": str(profile_path),
+                "samples": profiler.samples,
+                "interval": profiler.interval,
+                "top": profiler.top_functions(),
+            }
+        with open(log_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        logs = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for old_log in logs[:-MAX_RUN_LOGS]:
+            old_log.unlink(missing_ok=True)
+            old_log.with_suffix(".folded").unlink(missing_ok=True)
+    except OSError:
+        return None
+    return log_path
+
+
+@contextmanager
+def instrumented_run(
+    name: str, profile: Optional[bool] = None, details: Optional[dict] = None
+):
+    if profile is None:
+        profile = profiling_requested()
+    metrics = ExportMetrics()
+    profiler = SamplingProfiler() if profile else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        yield metrics
+    except BaseException as ex:
+        metrics.error = str(ex)
+        raise
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        metrics.finished = time.time()
+        metrics.log_path = write_run_log(name, metrics, profiler, details)
@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from pathlib import Path
+from typing import Optional
+
+from .books import DEFAULT_LANGUAGES
+from .cancel import CancellationToken
+from .copier import CopyBackend, CopyOptions, SyncMode, VerifyMode
+from .drives import copy_workers_for, destination_device
+from .export import handle_export_contents
+from .paths import user_data_dir
+from .progress import ExportProgress
+from .workers import ExportPool
+
+JOB_QUEUE_NAME = "jobs.json"
+JOB_QUEUE_VERSION = 1
+MAX_QUEUE_WORKERS = 16
+TRANSIENT_FIELDS = {"progress", "cancel"}
+
+
+class JobState(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class ExportJob:
+    content_type: str
+    src_directory: str
+    dst_directory: str
+    dst_name: str = "01"
+    incremental: bool = True
+    use_hash: bool = False
+    languages: list = field(default_factory=lambda: list(DEFAULT_LANGUAGES))
+    backend: str = CopyBackend.FAST.value
+    preserve_metadata: bool = True
+    sync_mode: str = SyncMode.NEVER.value
+    strip_tags: bool = False
+    verify: str = VerifyMode.NEVER.value
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = JobState.QUEUED.value
+    created: float = field(default_factory=time.time)
+    summary: str = ""
+    progress: Optional[ExportProgress] = field(default=None, compare=False)
+    cancel: Optional[CancellationToken] = field(default=None, compare=False)
+
+    @property
+    def device(self) -> str:
+        return destination_device(self.dst_directory) or self.dst_directory
+
+    def copy_options(self) -> CopyOptions:
+        return CopyOptions(
+            backend=CopyBackend(self.backend),
+            preserve_metadata=self.preserve_metadata,
+            sync_mode=SyncMode(self.sync_mode),
+            strip_tags=self.strip_tags,
+            verify=VerifyMode(self.verify),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            f.name: getattr(self, f.name)
+            for f in fields(self)
+            if f.name not in TRANSIENT_FIELDS
+        }
+
+    @classmethod
+    def from_dict(cls, job: dict) -> "ExportJob":
+        names = {f.name for f in fields(cls)} - TRANSIENT_FIELDS
+        return cls(**{k: v for k, v in job.items() if k in names})
+
+
+class JobQueue:
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_running: int = 4,
+        max_per_device: int = 1,
+        pool: Optional[ExportPool] = None,
+    ):
+        self.path = path
+        self.max_running = max_running
+        self.max_per_device = max_per_device
+        # With a pool the exports run in its worker processes; this
+        # process's threads only wait for them.
+        self.pool = pool
+        self.version = 0
+        self._lock = threading.Lock()
+        self._jobs = None
+        self._executor = None
+
+    @property
+    def max_workers(self) -> int:
+        # A job counts as running from the moment it is handed on, so more
+        # jobs than the pool has processes would only wait in its queue
+        # while showing as running and holding their device.
+        if self.pool is None:
+            return MAX_QUEUE_WORKERS
+        return max(1, min(MAX_QUEUE_WORKERS, self.pool.max_workers))
+
+    def _load(self) -> list:
+        if self._jobs is not None:
+            return self._jobs
+        if self.path is None:
+            self.path = user_data_dir() / JOB_QUEUE_NAME
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = dict()
+        if saved.get("version") != JOB_QUEUE_VERSION:
+            saved = dict()
+        self._jobs = []
+        for job_data in saved.get("jobs", []):
+            try:
+                job = ExportJob.from_dict(job_data)
+            except (TypeError, ValueError):
+                continue
+            # A job that was running when the app closed starts over.
+            if job.state == JobState.RUNNING.value:
+                job.state = JobState.QUEUED.value
+            self._jobs.append(job)
+        return self._jobs
+
+    def _save(self):
+        # Called with the lock held.
+        self.version += 1
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": JOB_QUEUE_VERSION,
+                        "jobs": [job.to_dict() for job in self._jobs],
+                    },
+                    f,
+                    indent=1,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._load())
+
+    def add(self, job: ExportJob) -> ExportJob:
+        with self._lock:
+            self._load().append(job)
+            self._save()
+        self.schedule()
+        return job
+
+    def remove(self, job_id: str):
+        with self._lock:
+            jobs = self._load()
+            self._jobs = [
+                j for j in jobs if j.id != job_id or j.state == JobState.RUNNING.value
+            ]
+            self._save()
+
+    def cancel(self, job_id: str):
+        with self._lock:
+            for job in self._load():
+                if job.id != job_id:
+                    continue
+                if job.state == JobState.QUEUED.value:
+                    job.state = JobState.CANCELLED.value
+                elif job.state == JobState.RUNNING.value and job.cancel is not None:
+                    job.cancel.cancel()
+            self._save()
+
+    def retry(self, job_id: str):
+        with self._lock:
+            for job in self._load():
+                if job.id == job_id and job.state in (
+                    JobState.FAILED.value,
+                    JobState.CANCELLED.value,
+                ):
+                    job.state = JobState.QUEUED.value
+                    job.summary = ""
+            self._save()
+        self.schedule()
+
+    def clear_finished(self):
+        with self._lock:
+            self._jobs = [
+                j
+                for j in self._load()
+                if j.state in (JobState.QUEUED.value, JobState.RUNNING.value)
+            ]
+            self._save()
+
+    def schedule(self):
+        with self._lock:
+            jobs = self._load()
+            running = [j for j in jobs if j.state == JobState.RUNNING.value]
+            busy_devices = [j.device for j in running]
+            started = []
+            max_running = min(self.max_running, self.max_workers)
+            for job in jobs:
+                if len(running) + len(started) >= max_running:
+                    break
+                if job.state != JobState.QUEUED.value:
+                    continue
+                device = job.device
+                if busy_devices.count(device) >= self.max_per_device:
+                    continue
+                job.state = JobState.RUNNING.value
+                job.progress = ExportProgress()
+                job.cancel = CancellationToken()
+                busy_devices.append(device)
+                started.append(job)
+            if len(started) <= 0:
+                return
+            self._save()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=MAX_QUEUE_WORKERS, thread_name_prefix="export-job"
+                )
+        for job in started:
+            self._executor.submit(self._run, job)
+
+    def _run(self, job: ExportJob):
+        args = (
+            job.content_type,
+            job.src_directory,
+            job.dst_directory,
+            job.dst_name,
+            copy_workers_for(job.dst_directory),
+            job.incremental,
+            job.use_hash,
+        )
+        kwargs = {
+            "progress": job.progress,
+            "copy_options": job.copy_options(),
+            "languages": tuple(job.languages),
+            "cancel": job.cancel,
+        }
+        try:
+            if self.pool is None:
+                result = handle_export_contents(*args, **kwargs)
+            else:
+                result = self.pool.run(handle_export_contents, *args, **kwargs)
+        except Exception as ex:
+            state, summary = JobState.FAILED, str(ex)
+        else:
+            state = JobState.CANCELLED if result.cancelled else JobState.DONE
+            summary = (
+                f"{result.copied} copied, {result.skipped} unchanged, "
+                f"{result.removed} removed"
+            )
+            if result.verified > 0 or len(result.mismatched) > 0:
+                summary += (
+                    f", {result.verified} verified, "
+                    f"{len(result.mismatched)} mismatched"
+                )
+            if len(result.mismatched) > 0:
+                state = JobState.FAILED
+        with self._lock:
+            job.state = state.value
+            job.summary = summary
+            self._save()
+        self.schedule()
+
+
+job_queue = JobQueue()
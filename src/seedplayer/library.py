@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+from .archives import is_archive, scan_archive
+from .paths import user_data_dir
+from .scan import SourceDirectory, SourceFile, scan_source
+
+LIBRARY_NAME = "library.sqlite3"
+LIBRARY_VERSION = 2
+# Directories changed this recently may change again within the same mtime
+# tick (two seconds on FAT), so they are rescanned next time regardless.
+RACY_MTIME_NS = 2_000_000_000
+
+LIBRARY_SCHEMA = """
+DROP TABLE IF EXISTS directories;
+DROP TABLE IF EXISTS files;
+DROP TABLE IF EXISTS plans;
+CREATE TABLE directories (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent TEXT,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    files TEXT NOT NULL,
+    PRIMARY KEY (root, path)
+);
+CREATE TABLE plans (
+    key TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    plan TEXT NOT NULL
+);
+"""
+
+
+def source_signature(directory: SourceDirectory) -> str:
+    digest = hashlib.sha256()
+
+    def add(d: SourceDirectory):
+        digest.update(
+            f"{d.path}\0{d.mtime_ns}\0{d.total_files}\0{d.total_bytes}\n".encode(
+                errors="surrogateescape"
+            )
+        )
+        for f in sorted(d.files, key=lambda f: f.name):
+            digest.update(
+                f"{f.name}\0{f.size}\0{f.mtime_ns}\n".encode(errors="surrogateescape")
+            )
+        for child in sorted(d.children, key=lambda c: c.path):
+            add(child)
+
+    add(directory)
+    return digest.hexdigest()
+
+
+class SourceLibrary:
+    # Remembers every scanned source tree so the next scan only lists the
+    # directories whose mtime changed, and keeps the plans made from them.
+    # A file rewritten in place doesn't touch its directory's mtime, so
+    # picking that up takes a rescan (forget) or a hash compare.
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is not None:
+            return self._db
+        if self.path is None:
+            self.path = user_data_dir() / LIBRARY_NAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        if db.execute("PRAGMA user_version").fetchone()[0] != LIBRARY_VERSION:
+            db.executescript(LIBRARY_SCHEMA)
+            db.execute(f"PRAGMA user_version = {LIBRARY_VERSION}")
+            db.commit()
+        self._db = db
+        return db
+
+    def scan(self, path: str) -> SourceDirectory:
+        try:
+            with self._lock:
+                return self._scan(path)
+        except sqlite3.Error:
+            return scan_source(path)
+
+    def _scan(self, root: str) -> SourceDirectory:
+        db = self._connect()
+        known = dict()
+        files = dict()
+        children = defaultdict(list)
+        for path, parent, name, mtime_ns, file_rows in db.execute(
+            "SELECT path, parent, name, mtime_ns, files FROM directories "
+            "WHERE root = ?",
+            (root,),
+        ):
+            known[path] = mtime_ns
+            files[path] = file_rows
+            children[parent].append((name, path))
+
+        racy = time.time_ns() - RACY_MTIME_NS
+        visited = []
+        changed = []
+
+        def visit(path: str, name: str, parent: Optional[str]) -> SourceDirectory:
+            # Unreadable folders raise, as in scan_source.
+            directory = SourceDirectory(name, path)
+            directory.mtime_ns = os.stat(path).st_mtime_ns
+            if known.get(path) == directory.mtime_ns:
+                file_rows = json.loads(files[path])
+                child_rows = children[path]
+            else:
+                file_rows, child_rows = list_directory(path)
+                mtime_ns = directory.mtime_ns if directory.mtime_ns < racy else -1
+                changed.append((path, parent, name, mtime_ns, file_rows))
+            visited.append(path)
+
+            for child_name, child_path in child_rows:
+                try:
+                    child = visit(child_path, child_name, path)
+                except FileNotFoundError:
+                    continue
+                if child.total_files > 0:
+                    directory.children.append(child)
+                    directory.total_files += child.total_files
+                    directory.total_bytes += child.total_bytes
+            for file_name, size, mtime_ns in file_rows:
+                directory.files.append(
+                    SourceFile(file_name, os.path.join(path, file_name), size, mtime_ns)
+                )
+                directory.total_files += 1
+                directory.total_bytes += size
+            return directory
+
+        source = visit(root, os.path.basename(root), None)
+        removed = set(known) - set(visited)
+        if len(changed) > 0 or len(removed) > 0:
+            with db:
+                db.executemany(
+                    "DELETE FROM directories WHERE root = ? AND path = ?",
+                    [(root, path) for path in removed],
+                )
+                db.executemany(
+                    "INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (root, path, parent, name, mtime_ns, json.dumps(file_rows))
+                        for path, parent, name, mtime_ns, file_rows in changed
+                    ],
+                )
+        return source
+
+    def cached_plan(self, key: str, signature: str) -> Optional[dict]:
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT signature, plan FROM plans WHERE key = ?", (key,)
+                    )
+                    .fetchone()
+                )
+        except (OSError, sqlite3.Error):
+            return None
+        if row is None or row[0] != signature:
+            return None
+        try:
+            return json.loads(row[1])
+        except ValueError:
+            return None
+
+    def store_plan(self, key: str, root: str, signature: str, plan: dict):
+        try:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?)",
+                        (key, root, signature, json.dumps(plan)),
+                    )
+        except (OSError, sqlite3.Error):
+            pass
+
+    def invalidate(self, root: str, directories):
+        # Makes the next scan list these directories again even if their
+        # mtime looks the same, e.g. after a file in them was rewritten, and
+        # the next plan start from scratch.
+        try:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    db.execute("DELETE FROM plans WHERE root = ?", (root,))
+                    db.executemany(
+                        "UPDATE directories SET mtime_ns = -1 "
+                        "WHERE root = ? AND path = ?",
+                        [(root, d) for d in directories],
+                    )
+        except (OSError, sqlite3.Error):
+            pass
+
+    def forget(self, root: str):
+        try:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    for table in ("directories", "plans"):
+                        db.execute(f"DELETE FROM {table} WHERE root = ?", (root,))
+        except (OSError, sqlite3.Error):
+            pass
+
+    def clear(self):
+        try:
+            with self._lock:
+                db = self._connect()
+                with db:
+                    for table in ("directories", "plans"):
+                        db.execute(f"DELETE FROM {table}")
+        except (OSError, sqlite3.Error):
+            pass
+
+    def close(self):
+        # The next use opens the database at self.path again, so this is
+        # also how to point the library at another file.
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def list_directory(path: str) -> tuple:
+    # Returns the (name, size, mtime_ns) of the MP3s in a directory and the
+    # (name, path) of its subdirectories, as scan_source would see them.
+    file_rows = []
+    child_rows = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                child_rows.append((entry.name, entry.path))
+            elif entry.name.endswith(".mp3") and entry.is_file():
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                file_rows.append(
+                    (entry.name, entry_stat.st_size, entry_stat.st_mtime_ns)
+                )
+    return file_rows, child_rows
+
+
+source_library = SourceLibrary()
+
+
+def scan_content(path: str) -> SourceDirectory:
+    if is_archive(path):
+        return scan_archive(path)
+    return source_library.scan(path)
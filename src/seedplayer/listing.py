@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .archives import ARCHIVE_SUFFIXES
+
+
+def list_directories(path: str) -> list:
+    directories = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        directories.append((entry.name, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        return directories
+    return sorted(directories, key=lambda d: d[0].lower())
+
+
+def list_archives(path: str) -> list:
+    archives = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    name = entry.name.lower()
+                    if name.endswith(ARCHIVE_SUFFIXES) and entry.is_file():
+                        archives.append((entry.name, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        return archives
+    return sorted(archives, key=lambda a: a[0].lower())
+
+
+class DirectoryCache:
+    def __init__(
+        self, max_entries: int = 256, ttl: float = 30.0, prefetch_workers: int = 2
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = set()
+        self._prefetcher = ThreadPoolExecutor(
+            max_workers=prefetch_workers, thread_name_prefix="folder-prefetch"
+        )
+
+    def get(self, path: str) -> Optional[list]:
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is None:
+                return None
+            expires, directories = cached
+            if expires < time.monotonic():
+                del self._entries[path]
+                return None
+            self._entries.move_to_end(path)
+            return directories
+
+    def load(self, path: str) -> list:
+        directories = list_directories(path)
+        with self._lock:
+            self._entries[path] = (time.monotonic() + self.ttl, directories)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._loading.discard(path)
+        return directories
+
+    async def list(self, path: str) -> list:
+        directories = self.get(path)
+        if directories is None:
+            directories = await asyncio.to_thread(self.load, path)
+        return directories
+
+    def prefetch(self, paths: list):
+        for path in paths:
+            if self.get(path) is not None:
+                continue
+            with self._lock:
+                if path in self._loading:
+                    continue
+                self._loading.add(path)
+            self._prefetcher.submit(self.load, path)
+
+
+FOLDER_PREFETCH_CHILDREN = 32
+directory_cache = DirectoryCache()
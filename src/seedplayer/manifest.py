@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .plan import PlannedFile
+
+MANIFEST_NAME = ".seedplayer-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_inside(root_path: Path, relative_path: str) -> bool:
+    # The manifest lives on the card and may be damaged or edited, so a path
+    # like "../x" or an absolute one must never reach outside the export.
+    root = os.path.normpath(root_path)
+    path = os.path.normpath(os.path.join(root, relative_path))
+    try:
+        return path != root and os.path.commonpath([root, path]) == root
+    except ValueError:
+        # Different drives on Windows.
+        return False
+
+
+def read_manifest(root_path: Path) -> dict:
+    try:
+        with open(root_path / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    if manifest.get("version") != MANIFEST_VERSION:
+        return dict()
+    return {
+        relative_path: entry
+        for relative_path, entry in manifest.get("files", dict()).items()
+        if is_inside(root_path, relative_path)
+    }
+
+
+def write_manifest(root_path: Path, entries: dict):
+    manifest_path = root_path / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": entries}, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def manifest_entry(
+    planned_file: PlannedFile, use_hash: bool = False, strip_tags: bool = False
+) -> dict:
+    entry = {
+        "source": str(planned_file.src),
+        "size": planned_file.size,
+        "mtime_ns": planned_file.mtime_ns,
+    }
+    if use_hash:
+        entry["sha256"] = file_digest(planned_file.src)
+    if strip_tags:
+        entry["strip_tags"] = True
+    return entry
+
+
+def is_unchanged(planned_file: PlannedFile, entry: dict, previous: Optional[dict]):
+    if previous is None:
+        return False
+    if entry.get("strip_tags", False) != previous.get("strip_tags", False):
+        return False
+    for key in ("source", "size", "mtime_ns", "sha256"):
+        if key in entry and key in previous and entry[key] != previous[key]:
+            return False
+    try:
+        return planned_file.dst.stat().st_size == previous.get("dst_size")
+    except OSError:
+        return False
+
+
+def remove_stale_files(root_path: Path, stale: list) -> int:
+    removed = 0
+    directories = set()
+    resolved_root = root_path.resolve()
+    for relative_path in stale:
+        stale_path = root_path / relative_path
+        # Checked again through any symlinks, since this deletes.
+        try:
+            stale_path.resolve().relative_to(resolved_root)
+        except ValueError:
+            continue
+        try:
+            stale_path.unlink()
+        except FileNotFoundError:
+            pass
+        else:
+            removed += 1
+        directories.add(stale_path.parent)
+    for directory in sorted(directories, key=lambda d: len(d.parts), reverse=True):
+        if directory == root_path or not directory.is_dir():
+            continue
+        if not any(directory.iterdir()):
+            directory.rmdir()
+    return removed
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .paths import user_cache_dir
+from .scan import SourceDirectory
+from .tags import read_track_info
+
+TAG_CACHE_NAME = "tags.json"
+TAG_CACHE_VERSION = 1
+TAG_READ_WORKERS = 8
+NUMBER_RUN = re.compile(r"(\d+)")
+
+
+def natural_key(name: str) -> list:
+    parts = NUMBER_RUN.split(name.casefold())
+    return [int(part) if index % 2 else part for index, part in enumerate(parts)]
+
+
+def source_files(directory: SourceDirectory):
+    yield from directory.files
+    for child in directory.children:
+        yield from source_files(child)
+
+
+class TagCache:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._entries is not None:
+            return self._entries
+        if self.path is None:
+            self.path = user_cache_dir() / TAG_CACHE_NAME
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = dict()
+        if cache.get("version") != TAG_CACHE_VERSION:
+            cache = dict()
+        self._entries = cache.get("files", dict())
+        return self._entries
+
+    def get(self, source_file) -> Optional[tuple]:
+        with self._lock:
+            entry = self._load().get(source_file.path)
+        if entry is None or entry[:2] != [source_file.size, source_file.mtime_ns]:
+            return None
+        return entry[2], entry[3]
+
+    def update(self, files, workers: int = TAG_READ_WORKERS):
+        missing = [f for f in files if self.get(f) is None]
+        if len(missing) <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            infos = list(executor.map(lambda f: read_track_info(f.path), missing))
+        with self._lock:
+            entries = self._load()
+            for source_file, (track, disc) in zip(missing, infos):
+                entries[source_file.path] = [
+                    source_file.size,
+                    source_file.mtime_ns,
+                    track,
+                    disc,
+                ]
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._load()
+            self._entries = dict()
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": TAG_CACHE_VERSION, "files": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+tag_cache = TagCache()
+
+
+def order_files(files: list, tags: TagCache = tag_cache) -> list:
+    # Tag order is only trusted when every file has a track number and no
+    # two files share a position; anything else falls back to a natural
+    # sort of the file names.
+    by_name = sorted(files, key=lambda f: natural_key(f.name))
+    positions = [tags.get(f) for f in by_name]
+    if any(p is None or p[0] is None for p in positions):
+        return by_name
+    keys = [(disc or 1, track) for track, disc in positions]
+    if len(set(keys)) != len(keys):
+        return by_name
+    order = sorted(range(len(by_name)), key=lambda index: keys[index])
+    return [by_name[index] for index in order]
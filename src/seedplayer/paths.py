@@ -0,0 +1,25 @@
+import os
+import sys
+from pathlib import Path
+
+
+def user_cache_dir() -> Path:
+    home = Path.home()
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or home / "AppData" / "Local"
+        return Path(base) / "SeedPlayer" / "Cache"
+    if sys.platform == "darwin":
+        return home / "Library" / "Caches" / "SeedPlayer"
+    base = os.environ.get("XDG_CACHE_HOME") or home / ".cache"
+    return Path(base) / "seedplayer"
+
+
+def user_data_dir() -> Path:
+    home = Path.home()
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or home / "AppData" / "Roaming"
+        return Path(base) / "SeedPlayer"
+    if sys.platform == "darwin":
+        return home / "Library" / "Application Support" / "SeedPlayer"
+    base = os.environ.get("XDG_DATA_HOME") or home / ".local" / "share"
+    return Path(base) / "seedplayer"
@@ -0,0 +1,258 @@
+import itertools
+import json
+import os
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Optional
+
+from .books import (
+    DEFAULT_LANGUAGES,
+    MIN_BOOK_CONFIDENCE,
+    BibleSection,
+    BookMatch,
+    book_resolver,
+    catalog_fingerprint,
+    section_book_number,
+)
+from .archives import is_archive
+from .library import scan_content, source_library, source_signature
+from .ordering import natural_key, order_files, source_files, tag_cache
+from .scan import SourceDirectory
+
+
+PLAN_CACHE_VERSION = 3
+
+
+def content_section(content_type: str) -> Optional[BibleSection]:
+    if content_type == "Bible":
+        return BibleSection.FULL
+    elif content_type == "New Testament":
+        return BibleSection.NEW
+    elif content_type == "Old Testament":
+        return BibleSection.OLD
+    return None
+
+
+@dataclass
+class PlannedFile:
+    src: Path
+    dst: Path
+    size: int
+    mtime_ns: int = 0
+
+
+@dataclass
+class ExportPlan:
+    content_type: str
+    src_directory: str
+    root_path: Path
+    directories: list = field(default_factory=list)
+    files: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    book_matches: dict = field(default_factory=dict)
+    source: Optional[SourceDirectory] = None
+    archive: Optional[str] = None
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(f.size for f in self.files)
+
+    @property
+    def copy_jobs(self) -> list:
+        return [(f.src, f.dst) for f in self.files]
+
+    def relative_path(self, path: Path) -> str:
+        return path.relative_to(self.root_path).as_posix()
+
+    def snapshot(self) -> dict:
+        # The plan relative to its root, as kept in the source library.
+        return {
+            "directories": [self.relative_path(d) for d in self.directories[1:]],
+            "files": [
+                [str(f.src), self.relative_path(f.dst), f.size, f.mtime_ns]
+                for f in self.files
+            ],
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "book_matches": [
+                [m.name, m.number, m.confidence, m.book]
+                for m in self.book_matches.values()
+            ],
+        }
+
+    def restore(self, snapshot: dict):
+        self.directories.extend(self.root_path / d for d in snapshot["directories"])
+        self.files = [
+            PlannedFile(Path(src), self.root_path / dst, size, mtime_ns)
+            for src, dst, size, mtime_ns in snapshot["files"]
+        ]
+        self.errors = list(snapshot["errors"])
+        self.warnings = list(snapshot["warnings"])
+        self.book_matches = {m[0]: BookMatch(*m) for m in snapshot["book_matches"]}
+
+    def rebase(self, dst_directory: str) -> "ExportPlan":
+        root_path = Path(os.path.join(dst_directory, self.root_path.name))
+        return replace(
+            self,
+            root_path=root_path,
+            directories=[root_path / self.relative_path(d) for d in self.directories],
+            files=[
+                replace(f, dst=root_path / self.relative_path(f.dst))
+                for f in self.files
+            ],
+            errors=list(self.errors),
+            warnings=list(self.warnings),
+        )
+
+
+def fix_filename(filename: str, file_id: int) -> str:
+    filename_parts = filename.split("_") if "_" in filename else filename.split(" ")
+    if len(filename_parts) > 0:
+        first_part = filename_parts[0]
+        last_part = filename_parts[-1]
+
+        try:
+            last_part_number = int(last_part.lower().replace(".mp3", ""))
+        except ValueError:
+            last_part_number = None
+
+        if last_part_number:
+            return f"{str(last_part_number).zfill(3)} {first_part}.mp3"
+        else:
+            try:
+                first_part_number = int(first_part.lower().replace(".mp3", ""))
+            except ValueError:
+                first_part_number = None
+            if first_part_number:
+                return filename
+    return f"{str(file_id).zfill(3)} {filename}"
+
+
+def plan_directory(
+    plan: ExportPlan,
+    directory: SourceDirectory,
+    section: Optional[BibleSection],
+    subfolder_map: dict,
+    subfolder_sources: dict,
+):
+    children = sorted(directory.children, key=lambda c: natural_key(c.name))
+    subfolder_ids = itertools.count(start=1)
+    for child in children:
+        if len(child.files) <= 0:
+            continue
+
+        if section is None:
+            sub_dst_id = next(subfolder_ids)
+        else:
+            match = plan.book_matches[child.name]
+            sub_dst_id = None
+            if match.confidence >= MIN_BOOK_CONFIDENCE:
+                sub_dst_id = section_book_number(match.number, section)
+            if sub_dst_id is not None and match.confidence < 1.0:
+                plan.warnings.append(
+                    f"Matched {child.name} to {match.book} ({match.confidence:.0%})"
+                )
+        if sub_dst_id is None or sub_dst_id <= 0:
+            if section is None:
+                sub_dst_id = next(subfolder_ids)
+            else:
+                plan.errors.append(
+                    f"Could not resolve the book number for {child.name}"
+                )
+                continue
+
+        subfolder_path = Path(os.path.join(plan.root_path, str(sub_dst_id).zfill(2)))
+        if subfolder_path in subfolder_sources:
+            plan.errors.append(
+                f"{child.path} and {subfolder_sources[subfolder_path]} "
+                f"both export to {subfolder_path.name}"
+            )
+            continue
+        subfolder_sources[subfolder_path] = child.path
+        subfolder_map[child.path] = subfolder_path
+        plan.directories.append(subfolder_path)
+
+    dest_folder_path = subfolder_map.get(directory.path, plan.root_path)
+    # Tags only decide the order; names stay the same however the source
+    # is read, so an archive and its folder export alike.
+    ordered_files = order_files(directory.files)
+    file_sources = dict()
+    for file_id, source_file in enumerate(ordered_files, start=1):
+        dest_name = fix_filename(source_file.name, file_id)
+        dest_file = Path(os.path.join(dest_folder_path, dest_name))
+        # Cards are FAT formatted, where names differing only in case clash.
+        dest_key = dest_name.lower()
+        if dest_key in file_sources:
+            plan.errors.append(
+                f"{source_file.path} and {file_sources[dest_key]} "
+                f"both export to {plan.relative_path(dest_file)}"
+            )
+            continue
+        file_sources[dest_key] = source_file.path
+        plan.files.append(
+            PlannedFile(
+                Path(source_file.path),
+                dest_file,
+                source_file.size,
+                source_file.mtime_ns,
+            )
+        )
+
+    for child in children:
+        plan_directory(plan, child, section, subfolder_map, subfolder_sources)
+
+
+def book_folder_names(directory: SourceDirectory) -> list:
+    names = [child.name for child in directory.children if len(child.files) > 0]
+    for child in directory.children:
+        names.extend(book_folder_names(child))
+    return names
+
+
+def plan_export(
+    content_type: str,
+    src_directory: str,
+    dst_directory: str,
+    dst_name: str = "01",
+    source: Optional[SourceDirectory] = None,
+    languages: tuple = DEFAULT_LANGUAGES,
+) -> ExportPlan:
+    if source is None:
+        source = scan_content(src_directory)
+    root_path = Path(os.path.join(dst_directory, dst_name))
+    plan = ExportPlan(
+        content_type, src_directory, root_path, directories=[root_path], source=source
+    )
+    if is_archive(src_directory):
+        plan.archive = src_directory
+    if source.total_files <= 0:
+        # Exporting nothing would only remove what is already on the card.
+        plan.errors.append(f"No MP3 files found in {src_directory}")
+        return plan
+    # Book numbers and file names only change with the source tree, so a
+    # plan made before from the same tree is reused as is.
+    fingerprint = catalog_fingerprint(tuple(languages))
+    cache_key = json.dumps(
+        [PLAN_CACHE_VERSION, content_type, src_directory, fingerprint]
+    )
+    signature = source_signature(source)
+    snapshot = source_library.cached_plan(cache_key, signature)
+    if snapshot is not None:
+        plan.restore(snapshot)
+        return plan
+
+    section = content_section(content_type)
+    if section is not None:
+        plan.book_matches = book_resolver(tuple(languages)).resolve_many(
+            book_folder_names(source)
+        )
+    if plan.archive is None:
+        # Archive members are ordered by name; reading their tags would mean
+        # decompressing every file before the copy even starts.
+        tag_cache.update(source_files(source))
+    subfolder_map = {src_directory: root_path}
+    plan_directory(plan, source, section, subfolder_map, dict())
+    tag_cache.save()
+    source_library.store_plan(cache_key, src_directory, signature, plan.snapshot())
+    return plan
@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from shutil import disk_usage
+from typing import Optional
+
+from .manifest import read_manifest
+from .plan import ExportPlan
+from .progress import format_bytes, format_duration
+
+DEFAULT_CLUSTER_SIZE = 4096
+PROBE_BYTES = 64 * 1024 * 1024
+PROBE_SECONDS = 2.0
+MIN_WRITE_RATE = 2 * 1024 * 1024
+
+
+@dataclass
+class PreflightReport:
+    required_bytes: int
+    free_bytes: int
+    cluster_size: int
+    write_rate: Optional[float] = None
+    errors: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+
+
+def existing_directory(path: Path) -> Path:
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
+
+
+def cluster_size(path: Path) -> int:
+    if hasattr(os, "statvfs"):
+        return os.statvfs(path).f_frsize or DEFAULT_CLUSTER_SIZE
+    if sys.platform == "win32":
+        import ctypes
+
+        sectors_per_cluster = ctypes.c_ulong()
+        bytes_per_sector = ctypes.c_ulong()
+        free_clusters = ctypes.c_ulong()
+        total_clusters = ctypes.c_ulong()
+        if ctypes.windll.kernel32.GetDiskFreeSpaceW(
+            ctypes.c_wchar_p(os.path.splitdrive(os.path.abspath(path))[0] + "\\"),
+            ctypes.byref(sectors_per_cluster),
+            ctypes.byref(bytes_per_sector),
+            ctypes.byref(free_clusters),
+            ctypes.byref(total_clusters),
+        ):
+            return sectors_per_cluster.value * bytes_per_sector.value
+    return DEFAULT_CLUSTER_SIZE
+
+
+def allocated_size(size: int, cluster: int) -> int:
+    return -(-size // cluster) * cluster
+
+
+def probe_write_speed(
+    directory: Path, max_bytes: int = PROBE_BYTES, max_seconds: float = PROBE_SECONDS
+) -> tuple:
+    # Returns (bytes per second, read back matches). Each block carries its
+    # index so a card that silently wraps or drops writes fails the read back.
+    block = bytearray(os.urandom(1024 * 1024))
+    probe_path = directory / ".seedplayer-probe.tmp"
+    written = 0
+    started = time.perf_counter()
+    try:
+        with open(probe_path, "wb", buffering=0) as f:
+            while written < max_bytes and time.perf_counter() - started < max_seconds:
+                block[:8] = (written // len(block)).to_bytes(8, "little")
+                f.write(block)
+                written += len(block)
+            os.fsync(f.fileno())
+        elapsed = time.perf_counter() - started
+
+        with open(probe_path, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            index = 0
+            matches = True
+            while chunk := f.read(len(block)):
+                block[:8] = index.to_bytes(8, "little")
+                if chunk != block:
+                    matches = False
+                    break
+                index += 1
+            matches = matches and index * len(block) == written
+    finally:
+        probe_path.unlink(missing_ok=True)
+    return (written / elapsed if elapsed > 0 else 0.0), matches
+
+
+def preflight_export(
+    plan: ExportPlan, probe_speed: bool = False, min_write_rate: int = MIN_WRITE_RATE
+) -> PreflightReport:
+    target = existing_directory(plan.root_path)
+    cluster = cluster_size(target)
+    required = sum(allocated_size(f.size, cluster) for f in plan.files)
+    required += len(plan.directories) * cluster
+    # Files from an earlier export are replaced or removed, so their
+    # clusters come back.
+    reclaimed = sum(
+        allocated_size(entry.get("dst_size", 0), cluster)
+        for entry in read_manifest(plan.root_path).values()
+    )
+    report = PreflightReport(
+        max(0, required - reclaimed), disk_usage(target).free, cluster
+    )
+    if report.required_bytes > report.free_bytes:
+        report.errors.append(
+            f"Not enough space on {target}: need {format_bytes(report.required_bytes)}"
+            f", {format_bytes(report.free_bytes)} free"
+        )
+
+    if probe_speed:
+        report.write_rate, matches = probe_write_speed(target)
+        if not matches:
+            report.errors.append(
+                f"{target} returned different data than was written; "
+                "the card may be counterfeit or failing"
+            )
+        elif report.write_rate < min_write_rate:
+            report.errors.append(
+                f"{target} writes at {report.write_rate / (1024 * 1024):.1f} MB/s, "
+                f"below the {min_write_rate / (1024 * 1024):.1f} MB/s minimum"
+            )
+        elif report.write_rate > 0:
+            report.warnings.append(
+                "Estimated write time "
+                f"{format_duration(report.required_bytes / report.write_rate)}"
+            )
+    return report
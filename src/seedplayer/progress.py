@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours > 0:
+        return f"{hours}:{minutes:02}:{seconds:02}"
+    return f"{minutes}:{seconds:02}"
+
+
+@dataclass
+class ProgressSnapshot:
+    files_done: int
+    total_files: int
+    bytes_done: int
+    total_bytes: int
+    rate: float
+    eta: Optional[float]
+
+    @property
+    def fraction(self) -> float:
+        if self.total_bytes <= 0:
+            return 1.0 if self.files_done >= self.total_files else 0.0
+        return self.bytes_done / self.total_bytes
+
+
+class ExportProgress:
+    RATE_WINDOW = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = deque()
+        self.total_files = 0
+        self.total_bytes = 0
+        self.files_done = 0
+        self.bytes_done = 0
+
+    def start(self, total_files: int, total_bytes: int):
+        with self._lock:
+            self.total_files = total_files
+            self.total_bytes = total_bytes
+            self.files_done = 0
+            self.bytes_done = 0
+            self._samples.clear()
+            self._samples.append((time.monotonic(), 0))
+
+    def add_bytes(self, count: int):
+        with self._lock:
+            self.bytes_done += count
+
+    def skip_bytes(self, count: int):
+        # Bytes that turned out not to need writing, such as stripped tags.
+        with self._lock:
+            self.total_bytes -= count
+
+    def file_done(self):
+        with self._lock:
+            self.files_done += 1
+
+    def update(
+        self, total_files: int, total_bytes: int, files_done: int, bytes_done: int
+    ):
+        # Takes the counts of an export running in another process.
+        with self._lock:
+            if bytes_done < self.bytes_done or len(self._samples) <= 0:
+                # The export started a new phase, such as verification.
+                self._samples.clear()
+                self._samples.append((time.monotonic(), bytes_done))
+            self.total_files = total_files
+            self.total_bytes = total_bytes
+            self.files_done = files_done
+            self.bytes_done = bytes_done
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            now = time.monotonic()
+            self._samples.append((now, self.bytes_done))
+            while (
+                len(self._samples) > 2
+                and now - self._samples[0][0] > self.RATE_WINDOW
+            ):
+                self._samples.popleft()
+            first_time, first_bytes = self._samples[0]
+            elapsed = now - first_time
+            rate = (self.bytes_done - first_bytes) / elapsed if elapsed > 0 else 0.0
+            remaining = self.total_bytes - self.bytes_done
+            eta = remaining / rate if rate > 0 else None
+            return ProgressSnapshot(
+                self.files_done,
+                self.total_files,
+                self.bytes_done,
+                self.total_bytes,
+                rate,
+                eta,
+            )
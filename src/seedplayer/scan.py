@@ -0,0 +1,62 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class SourceFile:
+    name: str
+    path: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class SourceDirectory:
+    name: str
+    path: str
+    files: list = field(default_factory=list)
+    children: list = field(default_factory=list)
+    total_files: int = 0
+    total_bytes: int = 0
+    mtime_ns: int = 0
+
+
+def scan_source(path: str, name: Optional[str] = None) -> SourceDirectory:
+    # Raises OSError when a folder can't be read: a tree with folders
+    # missing would make the export remove their files from the card.
+    if name is None:
+        name = os.path.basename(path)
+    directory = SourceDirectory(name, path)
+    directory.mtime_ns = os.stat(path).st_mtime_ns
+    with os.scandir(path) as entries:
+        entries = list(entries)
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            try:
+                child = scan_source(entry.path, entry.name)
+            except FileNotFoundError:
+                # Removed while the scan was running.
+                continue
+            if child.total_files > 0:
+                directory.children.append(child)
+                directory.total_files += child.total_files
+                directory.total_bytes += child.total_bytes
+        elif entry.name.endswith(".mp3") and entry.is_file():
+            try:
+                entry_stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            directory.files.append(
+                SourceFile(
+                    entry.name, entry.path, entry_stat.st_size, entry_stat.st_mtime_ns
+                )
+            )
+            directory.total_files += 1
+            directory.total_bytes += entry_stat.st_size
+    return directory
+
+
+def count_directories(directory: SourceDirectory) -> int:
+    return 1 + sum(count_directories(child) for child in directory.children)
@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Optional
+
+ID3V2_HEADER_SIZE = 10
+ID3V2_EXTENDED_HEADER_FLAG = 0x40
+ID3V2_FOOTER_FLAG = 0x10
+ID3V1_SIZE = 128
+
+# Frame ids for the track and disc numbers, by ID3v2 major version.
+TRACK_FRAMES = {
+    2: {b"TRK": "track", b"TPA": "disc"},
+    3: {b"TRCK": "track", b"TPOS": "disc"},
+    4: {b"TRCK": "track", b"TPOS": "disc"},
+}
+TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+MAX_TEXT_FRAME_SIZE = 1024
+LEADING_NUMBER = re.compile(r"\s*(\d+)")
+
+
+def syncsafe_int(data: bytes) -> int:
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def id3v2_tag_size(header: bytes) -> int:
+    if len(header) < ID3V2_HEADER_SIZE or header[:3] != b"ID3":
+        return 0
+    if header[3] == 0xFF or header[4] == 0xFF or any(b & 0x80 for b in header[6:10]):
+        return 0
+    size = ID3V2_HEADER_SIZE + syncsafe_int(header[6:10])
+    if header[5] & ID3V2_FOOTER_FLAG:
+        size += ID3V2_HEADER_SIZE
+    return size
+
+
+def is_frame_sync(data: bytes) -> bool:
+    return len(data) >= 2 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0
+
+
+def audio_range(f) -> tuple:
+    # Returns the (start, end) offsets of the MPEG audio in an open binary
+    # file, leaving out leading ID3v2 tags (cover art, padding and all) and a
+    # trailing ID3v1 tag. Only tag headers are read.
+    end = os.fstat(f.fileno()).st_size
+    start = 0
+    while start + ID3V2_HEADER_SIZE <= end:
+        f.seek(start)
+        size = id3v2_tag_size(f.read(ID3V2_HEADER_SIZE))
+        if size <= 0:
+            break
+        start += size
+    if start > 0:
+        f.seek(start)
+        if not is_frame_sync(f.read(2)):
+            # The tag size is wrong or something we don't know follows it,
+            # so keep the file whole rather than cut into the audio.
+            start = 0
+
+    if end - start >= ID3V1_SIZE:
+        f.seek(end - ID3V1_SIZE)
+        if f.read(3) == b"TAG":
+            end -= ID3V1_SIZE
+    return start, end
+
+
+def decode_text_frame(data: bytes) -> str:
+    if len(data) <= 0:
+        return ""
+    encoding = TEXT_ENCODINGS.get(data[0], "latin-1")
+    return data[1:].decode(encoding, errors="ignore").split("\x00")[0]
+
+
+def parse_position(text: str) -> Optional[int]:
+    # Track and disc frames hold "3" or "3/12".
+    match = LEADING_NUMBER.match(text)
+    if match is None or int(match.group(1)) <= 0:
+        return None
+    return int(match.group(1))
+
+
+def read_track_info(path: str) -> tuple:
+    # Returns (track, disc) from the ID3v2 tag, reading frame headers and the
+    # two small text frames only.
+    found = dict()
+    try:
+        with open(path, "rb") as f:
+            header = f.read(ID3V2_HEADER_SIZE)
+            if id3v2_tag_size(header) <= 0 or header[3] not in TRACK_FRAMES:
+                return None, None
+            version = header[3]
+            wanted = TRACK_FRAMES[version]
+            id_length, size_length = (3, 3) if version == 2 else (4, 4)
+            frame_header_size = 6 if version == 2 else 10
+            end = ID3V2_HEADER_SIZE + syncsafe_int(header[6:10])
+
+            position = ID3V2_HEADER_SIZE
+            if version > 2 and header[5] & ID3V2_EXTENDED_HEADER_FLAG:
+                size_bytes = f.read(4)
+                if version == 4:
+                    position += syncsafe_int(size_bytes)
+                else:
+                    position += 4 + int.from_bytes(size_bytes, "big")
+
+            while position + frame_header_size <= end and len(found) < len(wanted):
+                f.seek(position)
+                frame_header = f.read(frame_header_size)
+                if len(frame_header) < frame_header_size or frame_header[0] == 0:
+                    break
+                frame_id = frame_header[:id_length]
+                size_bytes = frame_header[id_length : id_length + size_length]
+                if version == 4:
+                    frame_size = syncsafe_int(size_bytes)
+                else:
+                    frame_size = int.from_bytes(size_bytes, "big")
+                key = wanted.get(frame_id)
+                if key is not None and frame_size <= MAX_TEXT_FRAME_SIZE:
+                    found[key] = parse_position(decode_text_frame(f.read(frame_size)))
+                position += frame_header_size + frame_size
+    except OSError:
+        return None, None
+    return found.get("track"), found.get("disc")
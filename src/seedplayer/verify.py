@@ -0,0 +1,248 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .archives import (
+    archive_members,
+    copy_archive_members,
+    copy_member_audio,
+    reading_archive,
+)
+from .cancel import CancellationToken
+from .copier import CopyOptions, VerifyMode, buffered_copy, copy_files, sync_files
+from .drives import DEFAULT_COPY_WORKERS
+from .plan import ExportPlan
+from .progress import ExportProgress
+from .tags import audio_range
+
+VERIFY_WORKERS = 4
+VERIFY_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+@dataclass
+class VerifyResult:
+    verified: int = 0
+    mismatched: list = field(default_factory=list)
+    rewritten: int = 0
+
+
+class DigestWriter:
+    # Stands in for the destination file so the archive copy helpers can
+    # stream a member into a hash.
+    def __init__(self):
+        self.digest = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return len(data)
+
+
+def source_digest(path: Path, strip_tags: bool = False) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start, end = audio_range(f) if strip_tags else (0, size)
+        if end > start:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mapped) as view:
+                    digest.update(view[start:end])
+    return digest.hexdigest()
+
+
+def archive_digests(
+    plan: ExportPlan,
+    files: list,
+    strip_tags: bool,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    wanted = {
+        Path(f.src).relative_to(plan.archive).as_posix(): plan.relative_path(f.dst)
+        for f in files
+    }
+    digests = dict()
+    with reading_archive(plan.archive):
+        for name, size, _, open_member in archive_members(plan.archive):
+            relative_path = wanted.get(name)
+            if relative_path is None:
+                continue
+            writer = DigestWriter()
+            with open_member() as fsrc:
+                if strip_tags:
+                    copy_member_audio(
+                        fsrc, writer, size, VERIFY_BUFFER_SIZE, None, cancel
+                    )
+                else:
+                    buffered_copy(
+                        fsrc, writer, VERIFY_BUFFER_SIZE, size, None, cancel
+                    )
+            digests[relative_path] = writer.digest.hexdigest()
+    return digests
+
+
+def source_digests(
+    plan: ExportPlan,
+    files: list,
+    strip_tags: bool,
+    entries: Optional[dict] = None,
+    workers: int = VERIFY_WORKERS,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    # Keyed by path relative to the export root, so one set of source
+    # digests can check every destination of a fan-out.
+    if plan.archive is not None:
+        return archive_digests(plan, files, strip_tags, cancel)
+
+    digests = dict()
+    hashed = []
+    for planned_file in files:
+        relative_path = plan.relative_path(planned_file.dst)
+        entry = (entries or dict()).get(relative_path, dict())
+        if not strip_tags and "sha256" in entry:
+            # Hashed already for the incremental comparison.
+            digests[relative_path] = entry["sha256"]
+        else:
+            hashed.append(planned_file)
+
+    def digest(planned_file) -> str:
+        if cancel is not None:
+            cancel.check()
+        return source_digest(planned_file.src, strip_tags)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for planned_file, file_digest in zip(hashed, executor.map(digest, hashed)):
+            digests[plan.relative_path(planned_file.dst)] = file_digest
+    return digests
+
+
+def destination_digest(
+    path: Path,
+    buffer: memoryview,
+    progress: Optional[ExportProgress] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # Drop what the copy left in the page cache so the bytes are
+            # read back from the card itself.
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        while count := f.readinto(buffer):
+            if cancel is not None:
+                cancel.check()
+            digest.update(buffer[:count])
+            if progress is not None:
+                progress.add_bytes(count)
+    return digest.hexdigest()
+
+
+def destination_digests(
+    plan: ExportPlan,
+    files: list,
+    progress: Optional[ExportProgress] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    # One file after another: flash cards read fastest sequentially, and
+    # each device gets its own reader.
+    sync_files([f.dst for f in files])
+    digests = dict()
+    with memoryview(bytearray(VERIFY_BUFFER_SIZE)) as buffer:
+        for planned_file in files:
+            relative_path = plan.relative_path(planned_file.dst)
+            try:
+                digests[relative_path] = destination_digest(
+                    planned_file.dst, buffer, progress, cancel
+                )
+            except OSError:
+                digests[relative_path] = None
+            if progress is not None:
+                progress.file_done()
+    return digests
+
+
+def destination_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def read_back(
+    plan: ExportPlan,
+    files: list,
+    progress: Optional[ExportProgress] = None,
+    cancel: Optional[CancellationToken] = None,
+) -> dict:
+    if progress is not None:
+        progress.start(len(files), sum(destination_size(f.dst) for f in files))
+    return destination_digests(plan, files, progress, cancel)
+
+
+def compare_digests(plan: ExportPlan, files: list, expected: dict, actual: dict):
+    mismatched = []
+    for planned_file in files:
+        relative_path = plan.relative_path(planned_file.dst)
+        digest = actual.get(relative_path)
+        if digest is None or digest != expected.get(relative_path):
+            mismatched.append(planned_file)
+    return mismatched
+
+
+def rewrite_files(
+    plan: ExportPlan,
+    files: list,
+    options: CopyOptions,
+    workers: int,
+    progress: Optional[ExportProgress] = None,
+    cancel: Optional[CancellationToken] = None,
+):
+    if progress is not None:
+        progress.start(len(files), sum(f.size for f in files))
+    copy_jobs = [(f.src, f.dst) for f in files]
+    if plan.archive is not None:
+        copy_archive_members(plan.archive, copy_jobs, progress, options, cancel=cancel)
+    else:
+        copy_files(copy_jobs, workers, progress, options, cancel=cancel)
+
+
+def verify_export(
+    plan: ExportPlan,
+    files: list,
+    options: CopyOptions,
+    entries: Optional[dict] = None,
+    workers: int = DEFAULT_COPY_WORKERS,
+    progress: Optional[ExportProgress] = None,
+    cancel: Optional[CancellationToken] = None,
+    sources: Optional[Future] = None,
+) -> VerifyResult:
+    # The sources are hashed on a pool while the destination is read back;
+    # with VerifyMode.REWRITE only the files that differ are copied again
+    # and checked once more.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if sources is None:
+            sources = executor.submit(
+                source_digests,
+                plan,
+                files,
+                options.strip_tags,
+                entries,
+                VERIFY_WORKERS,
+                cancel,
+            )
+        actual = read_back(plan, files, progress, cancel)
+        expected = sources.result()
+    result = VerifyResult(mismatched=compare_digests(plan, files, expected, actual))
+    if options.verify == VerifyMode.REWRITE and len(result.mismatched) > 0:
+        rewrite_files(plan, result.mismatched, options, workers, progress, cancel)
+        result.rewritten = len(result.mismatched)
+        actual = read_back(plan, result.mismatched, progress, cancel)
+        result.mismatched = compare_digests(
+            plan, result.mismatched, expected, actual
+        )
+    result.verified = len(files) - len(result.mismatched)
+    return result
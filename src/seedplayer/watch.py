@@ -0,0 +1,256 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Optional
+
+from .archives import is_archive
+from .books import DEFAULT_LANGUAGES
+from .cancel import CancellationToken
+from .copier import CopyOptions
+from .export import handle_export_contents
+from .library import source_library
+from .progress import ExportProgress
+
+WATCH_DEBOUNCE = 2.0
+# However busy the source, a sync starts this long after the first change.
+WATCH_MAX_DELAY = 30.0
+WATCH_POLL_INTERVAL = 5.0
+WATCH_IDLE_TIMEOUT = 1.0
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+INOTIFY_MASK = (
+    IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+class InotifyWatcher:
+    # Reports the directories under root that changed. Every directory gets
+    # its own watch, and new ones are watched as they appear.
+    idle_timeout = WATCH_IDLE_TIMEOUT
+
+    def __init__(self, root: str):
+        self.root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = dict()
+        try:
+            self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, path: str):
+        for directory, _, _ in os.walk(path):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), INOTIFY_MASK
+            )
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                # Usually ENOSPC: out of watches for a big library.
+                raise OSError(error, os.strerror(error), directory)
+            self._watches[wd] = directory
+
+    def read_changes(self, timeout: float) -> set:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if len(ready) <= 0:
+            return set()
+        changed = set()
+        try:
+            data = os.read(self._fd, INOTIFY_READ_SIZE)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so anything may have changed.
+                changed.update(self._watches.values())
+                changed.add(self.root)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            changed.add(directory)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                child = os.path.join(directory, name)
+                try:
+                    self._watch_tree(child)
+                except OSError:
+                    pass
+                changed.add(child)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def tree_snapshot(root: str) -> dict:
+    snapshot = dict()
+    for directory, _, names in os.walk(root):
+        files = []
+        for name in names:
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                file_stat = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            files.append((name, file_stat.st_size, file_stat.st_mtime_ns))
+        snapshot[directory] = sorted(files)
+    return snapshot
+
+
+class PollingWatcher:
+    # For platforms without inotify, or when the library has more folders
+    # than the inotify watch limit: compares the file sizes and mtimes of
+    # the whole tree on every poll.
+    def __init__(self, root: str, interval: float = WATCH_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.idle_timeout = interval
+        self._snapshot = tree_snapshot(root)
+
+    def read_changes(self, timeout: float) -> set:
+        time.sleep(timeout)
+        snapshot = tree_snapshot(self.root)
+        changed = {
+            directory
+            for directory in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(directory) != self._snapshot.get(directory)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def source_watcher(root: str, poll_interval: float = WATCH_POLL_INTERVAL):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError, TypeError):
+            pass
+    return PollingWatcher(root, poll_interval)
+
+
+def wait_for_changes(
+    watcher,
+    debounce: float = WATCH_DEBOUNCE,
+    cancel: Optional[CancellationToken] = None,
+) -> set:
+    # Collects changes until the source has been quiet for the debounce
+    # time, so a folder being copied in syncs once instead of per file.
+    changed = set()
+    first_change = None
+    while cancel is None or not cancel.cancelled:
+        if first_change is not None:
+            if time.monotonic() - first_change >= WATCH_MAX_DELAY:
+                break
+            timeout = min(debounce, watcher.idle_timeout)
+        else:
+            timeout = watcher.idle_timeout
+        batch = watcher.read_changes(timeout)
+        if len(batch) > 0:
+            changed |= batch
+            if first_change is None:
+                first_change = time.monotonic()
+        elif first_change is not None:
+            break
+    return changed
+
+
+def watch_export(
+    content_type: str,
+    src_directory: str,
+    dst_directory: str,
+    dst_name: str = "01",
+    workers: Optional[int] = None,
+    use_hash: bool = False,
+    progress: Optional[ExportProgress] = None,
+    copy_options: Optional[CopyOptions] = None,
+    languages: tuple = DEFAULT_LANGUAGES,
+    cancel: Optional[CancellationToken] = None,
+    on_sync: Optional[Callable] = None,
+    debounce: float = WATCH_DEBOUNCE,
+    poll_interval: float = WATCH_POLL_INTERVAL,
+):
+    # Keeps dst in step with src until cancelled. Each sync is an
+    # incremental export, so only the files the change affected are copied
+    # or removed; on_sync(result, error) is called after every one.
+    if is_archive(src_directory) or not os.path.isdir(src_directory):
+        raise ValueError(f"{src_directory} is not a folder that can be watched")
+    if cancel is None:
+        cancel = CancellationToken()
+
+    # Watching starts before the first sync so nothing in between is missed.
+    watcher = source_watcher(src_directory, poll_interval)
+    try:
+        while not cancel.cancelled:
+            try:
+                result = handle_export_contents(
+                    content_type,
+                    src_directory,
+                    dst_directory,
+                    dst_name,
+                    workers,
+                    True,
+                    use_hash,
+                    progress,
+                    copy_options,
+                    False,
+                    languages,
+                    cancel=cancel,
+                )
+            except (OSError, ValueError) as ex:
+                result, error = None, ex
+            else:
+                error = None
+            if on_sync is not None and not cancel.cancelled:
+                on_sync(result, error)
+
+            changed = wait_for_changes(watcher, debounce, cancel)
+            if len(changed) > 0:
+                source_library.invalidate(src_directory, changed)
+    finally:
+        watcher.close()
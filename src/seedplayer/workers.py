@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+
+from .cancel import CancellationToken
+from .progress import ExportProgress
+
+EXPORT_PROCESSES = max(1, min(4, os.cpu_count() or 1))
+# How often progress and cancellation cross between the processes.
+SHARE_INTERVAL = 0.25
+# Each export shares one block of counters: the cancel flag, then
+# total_files, total_bytes, files_done and bytes_done per progress.
+PROGRESS_FIELDS = 4
+COUNTER_FORMAT = "q"
+COUNTER_SIZE = 8
+
+
+def progress_offset(index: int) -> int:
+    return 1 + index * PROGRESS_FIELDS
+
+
+def run_shared(
+    function: Callable, name: str, labels: list, single: bool, args, kwargs
+):
+    # Runs in the worker process: the export gets local progress and
+    # cancellation, and a thread mirrors them through the shared block.
+    block = shared_memory.SharedMemory(name)
+    counters = block.buf.cast(COUNTER_FORMAT)
+    progresses = {label: ExportProgress() for label in labels}
+    cancel = CancellationToken()
+    if counters[0]:
+        cancel.cancel()
+    done = threading.Event()
+
+    def share():
+        while True:
+            finished = done.wait(SHARE_INTERVAL)
+            if counters[0]:
+                cancel.cancel()
+            for index, progress in enumerate(progresses.values()):
+                offset = progress_offset(index)
+                counters[offset] = progress.total_files
+                counters[offset + 1] = progress.total_bytes
+                counters[offset + 2] = progress.files_done
+                counters[offset + 3] = progress.bytes_done
+            if finished:
+                return
+
+    sharer = threading.Thread(target=share, daemon=True)
+    sharer.start()
+    try:
+        if single:
+            kwargs["progress"] = progresses[labels[0]]
+        else:
+            kwargs["progresses"] = progresses
+        return function(*args, cancel=cancel, **kwargs)
+    finally:
+        done.set()
+        sharer.join()
+        counters.release()
+        block.close()
+
+
+class SharedExport:
+    # The UI side of an export running in the pool.
+    def __init__(
+        self,
+        future: Future,
+        block: shared_memory.SharedMemory,
+        progresses: dict,
+        cancel: Optional[CancellationToken],
+    ):
+        self.future = future
+        self.progresses = progresses
+        self.cancel = cancel
+        self._block = block
+        self._counters = block.buf.cast(COUNTER_FORMAT)
+
+    def share(self):
+        if self.cancel is not None and self.cancel.cancelled:
+            self._counters[0] = 1
+        for index, progress in enumerate(self.progresses.values()):
+            if progress is None:
+                continue
+            offset = progress_offset(index)
+            progress.update(*self._counters[offset : offset + PROGRESS_FIELDS])
+
+    def abandon(self):
+        self._counters[0] = 1
+        self.close()
+
+    def close(self):
+        self._counters.release()
+        self._block.close()
+        self._block.unlink()
+
+
+class ExportPool:
+    # Runs exports in worker processes so copying, hashing and tag parsing
+    # never hold up the UI. At most max_workers exports run at once; the
+    # rest wait in the pool's queue.
+    def __init__(self, max_workers: int = EXPORT_PROCESSES):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(
+        self,
+        function: Callable,
+        *args,
+        progress: Optional[ExportProgress] = None,
+        progresses: Optional[dict] = None,
+        cancel: Optional[CancellationToken] = None,
+        **kwargs,
+    ) -> SharedExport:
+        # function must be importable by the workers and take cancel and
+        # either progress or progresses as keywords.
+        single = progresses is None
+        if single:
+            progresses = {"": progress}
+        labels = list(progresses)
+        block = shared_memory.SharedMemory(
+            create=True, size=progress_offset(len(labels)) * COUNTER_SIZE
+        )
+        try:
+            with self._lock:
+                if self._executor is None:
+                    # Spawned rather than forked: a fork would copy the UI
+                    # process's threads and event loop.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                future = self._executor.submit(
+                    run_shared, function, block.name, labels, single, args, kwargs
+                )
+        except BaseException:
+            block.close()
+            block.unlink()
+            raise
+        return SharedExport(future, block, progresses, cancel)
+
+    def _result(self, export: SharedExport):
+        export.share()
+        try:
+            return export.future.result()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next export.
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            export.close()
+
+    def run(self, function: Callable, *args, **kwargs):
+        export = self.submit(function, *args, **kwargs)
+        while len(wait([export.future], SHARE_INTERVAL).not_done) > 0:
+            export.share()
+        return self._result(export)
+
+    async def run_async(self, function: Callable, *args, **kwargs):
+        # Waits on the event loop without tying up a thread per export.
+        export = self.submit(function, *args, **kwargs)
+        try:
+            while not export.future.done():
+                export.share()
+                await asyncio.sleep(SHARE_INTERVAL)
+        except BaseException:
+            # Nobody is waiting for the result any more, e.g. the browser
+            # that started the export went away.
+            export.abandon()
+            raise
+        return self._result(export)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+export_pool = ExportPool()
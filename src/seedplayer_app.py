@@ -0,0 +1,824 @@
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+from nicegui import app, background_tasks, ui
+
+from seedplayer.books import DEFAULT_LANGUAGES, available_languages
+from seedplayer.cancel import CancellationToken
+from seedplayer.copier import CopyBackend, CopyOptions, SyncMode, VerifyMode
+from seedplayer.drives import (
+    DEFAULT_COPY_WORKERS,
+    connected_drives,
+    copy_workers_for,
+    destination_device,
+    device_copy_workers,
+    drive_registry,
+    home_drive,
+)
+from seedplayer.export import (
+    CONTENT_TYPES,
+    compare_copy_backends,
+    handle_export_contents,
+)
+from seedplayer.fanout import handle_fan_out_export
+from seedplayer.jobs import MAX_QUEUE_WORKERS, ExportJob, JobState, job_queue
+from seedplayer.library import source_library
+from seedplayer.listing import (
+    FOLDER_PREFETCH_CHILDREN,
+    directory_cache,
+    list_archives,
+)
+from seedplayer.plan import ExportPlan, plan_export
+from seedplayer.preflight import PreflightReport, preflight_export
+from seedplayer.progress import ExportProgress, format_bytes, format_duration
+from seedplayer.workers import EXPORT_PROCESSES, export_pool
+
+
+class DriveSelect(ui.select):
+    def __init__(
+        self,
+        label: str = "Drive",
+        on_change: Optional[Callable] = None,
+        multiple: bool = False,
+    ):
+        options = connected_drives()
+
+        super().__init__(
+            options=options,
+            label=label,
+            on_change=on_change,
+            with_input=False,
+            multiple=multiple,
+        )
+
+        self.classes("w-1/4")
+        self._drives_version = drive_registry.version
+        drive_registry.start()
+        ui.timer(drive_registry.poll_interval, self._sync_drives)
+
+    def _sync_drives(self):
+        if self._drives_version == drive_registry.version:
+            return
+        self._drives_version = drive_registry.version
+        options = connected_drives()
+        if self.multiple:
+            self.set_value([v for v in self.value or [] if v in options])
+        elif self.value is not None and self.value not in options:
+            self.set_value(None)
+        self.set_options(options)
+
+
+class FolderPicker(ui.dialog):
+    def __init__(
+        self,
+        label: Optional[str] = None,
+        drive_label: Optional[str] = "Drive",
+        include_archives: bool = False,
+    ):
+        super().__init__()
+        self.include_archives = include_archives
+
+        with self, ui.card():
+            if label:
+                ui.label(label)
+            with ui.row().classes("w-full justify-start"):
+                self.drive = DriveSelect(
+                    label=drive_label, on_change=lambda: self.update_grid(True)
+                )
+            self.grid = (
+                ui.aggrid(
+                    {
+                        "columnDefs": [{"field": "name", "headerName": "Folder"}],
+                        "rowSelection": "single",
+                    },
+                    html_columns=[0],
+                )
+                .classes("w-96")
+                .on("cellDoubleClicked", self.handle_double_click)
+            )
+            with ui.row().classes("w-full justify-end"):
+                ui.button("Cancel", on_click=self.close).props("outline")
+                ui.button("Select", on_click=self._handle_select)
+
+            if self.drive.value is None:
+                user_drive = home_drive()
+                if user_drive is None:
+                    return
+                drive_path = user_drive.mountpoint
+                self.drive.value = drive_path
+            else:
+                drive_path = self.drive.value
+            self.path = Path(drive_path)
+            self.last_selection = self.path
+            background_tasks.create(self.update_grid(False))
+
+    async def update_grid(self, drive_changed=False):
+        if drive_changed:
+            if self.drive.value is None:
+                user_drive = home_drive()
+                if user_drive is None:
+                    return
+                drive_path = user_drive.mountpoint
+            else:
+                drive_path = self.drive.value
+            self.path = Path(drive_path)
+            self.last_selection = self.path
+
+        path = self.path
+        directories = await directory_cache.list(str(path))
+        archives = []
+        if self.include_archives:
+            archives = await asyncio.to_thread(list_archives, str(path))
+        if path != self.path:
+            return
+
+        self.grid.options["rowData"] = [
+            {
+                "name": f"📁 <strong>{name}</strong>",
+                "path": directory_path,
+            }
+            for name, directory_path in directories
+        ] + [
+            {"name": f"📦 {name}", "path": archive_path, "archive": True}
+            for name, archive_path in archives
+        ]
+
+        parent = str(self.path.parent)
+        if parent and parent != "":
+            self.grid.options["rowData"].insert(
+                0,
+                {
+                    "name": "📁 <strong>..</strong>",
+                    "path": parent,
+                },
+            )
+        self.grid.update()
+
+        directory_cache.prefetch(
+            [parent] + [p for _, p in directories[:FOLDER_PREFETCH_CHILDREN]]
+        )
+
+    async def handle_double_click(self, msg: dict) -> None:
+        if msg["args"]["data"].get("archive"):
+            self.submit(msg["args"]["data"]["path"])
+            return
+        self.path = Path(msg["args"]["data"]["path"])
+        self.last_selection = self.path
+        await self.update_grid(False)
+
+    async def _handle_select(self):
+        rows = await ui.run_javascript(
+            f"getElement({self.grid.id}).gridOptions.api.getSelectedRows()"
+        )
+        selection = list([r["path"] for r in rows])
+        if len(selection) <= 0:
+            selection = self.last_selection
+        else:
+            selection = selection[0]
+        self.submit(str(selection))
+
+
+def pick_folder(label: str, input_ctr: ui.input, include_archives: bool = False):
+    async def _pick_folder():
+        folder = await FolderPicker(label, include_archives=include_archives)
+        if folder:
+            input_ctr.set_value(folder)
+
+    return _pick_folder
+
+
+def verification_text(result) -> str:
+    if result.verified <= 0 and len(result.mismatched) <= 0:
+        return ""
+    text = f", {result.verified} verified"
+    if result.rewritten > 0:
+        text += f", {result.rewritten} rewritten"
+    if len(result.mismatched) > 0:
+        text += f", {len(result.mismatched)} DO NOT MATCH: " + ", ".join(
+            result.mismatched[:5]
+        )
+    return text
+
+
+def job_status(job: ExportJob) -> str:
+    if job.state == JobState.RUNNING.value and job.progress is not None:
+        snapshot = job.progress.snapshot()
+        if snapshot.total_files > 0:
+            return (
+                f"{snapshot.fraction:.0%} at "
+                f"{snapshot.rate / (1024 * 1024):.1f} MB/s"
+            )
+    return job.summary
+
+
+class ExportPage:
+    # Built once per browser client, so every operator of a shared station
+    # has their own form, results and running export. The job queue, drive
+    # registry and export pool are shared by all of them.
+    def __init__(self):
+        ui.colors(primary="#C53030", secondary="#429300")
+        with ui.row():
+            ui.label("SeedPlayer Content Tool").classes(
+                "text-2xl font-bold leading-tight text-red-700"
+            )
+        with ui.row().classes("w-full"):
+            self.content_type = ui.select(
+                options=CONTENT_TYPES,
+                label="Content Type",
+                value="Bible",
+            ).classes("w-1/2")
+            self.languages = (
+                ui.select(
+                    options=available_languages(),
+                    label="Book Name Languages",
+                    value=list(DEFAULT_LANGUAGES),
+                    multiple=True,
+                )
+                .classes("w-1/3")
+                .bind_visibility_from(
+                    self.content_type, "value", backward=lambda v: v != "Other"
+                )
+            )
+        with ui.row():
+            with ui.column():
+                with ui.input("Source Directory or Archive") as self.src_dir:
+                    ui.button(
+                        on_click=pick_folder(
+                            "Please Select Source Content Folder or Archive",
+                            self.src_dir,
+                            True,
+                        ),
+                    ).props("icon=create_new_folder flat")
+                    ui.button(on_click=self.rescan_source).props(
+                        "icon=refresh flat"
+                    ).tooltip(
+                        "Scan the source again instead of using the library index, "
+                        "e.g. after files were rewritten in place"
+                    ).bind_visibility_from(self.src_dir, "value")
+            with ui.column().bind_visibility_from(self.src_dir, "value"):
+                with ui.input(
+                    "Destination Directory",
+                    on_change=lambda e: self.copy_workers.set_value(
+                        copy_workers_for(e.value or "")
+                    ),
+                ) as self.dst_dir:
+                    ui.button(
+                        on_click=pick_folder(
+                            "Please Select Destination Content Folder", self.dst_dir
+                        ),
+                    ).props("icon=create_new_folder flat")
+                self.extra_drives = DriveSelect(
+                    label="Also Copy To", multiple=True
+                ).classes("w-full", remove="w-1/4")
+                self.dst_name = ui.input(
+                    label="Destination Folder Name",
+                    placeholder="Folder Name",
+                    value="01",
+                )
+                self.copy_workers = ui.number(
+                    label="Copy Workers",
+                    value=DEFAULT_COPY_WORKERS,
+                    min=1,
+                    max=16,
+                    precision=0,
+                )
+                self.incremental = ui.checkbox("Only copy changed files", value=True)
+                self.use_hash = ui.checkbox(
+                    "Compare file hashes"
+                ).bind_visibility_from(self.incremental, "value")
+                self.probe_speed = ui.checkbox("Test card write speed first")
+                with ui.expansion("Copy Options").classes("w-full"):
+                    self.copy_backend = ui.select(
+                        options={
+                            CopyBackend.FAST.value: "Fast (kernel copy)",
+                            CopyBackend.COPY2.value: "Standard (copy2)",
+                        },
+                        label="Copy Backend",
+                        value=CopyBackend.FAST.value,
+                    ).classes("w-full")
+                    self.preserve_metadata = ui.checkbox(
+                        "Copy timestamps and permissions", value=True
+                    ).bind_visibility_from(
+                        self.copy_backend, "value", value=CopyBackend.FAST.value
+                    )
+                    self.strip_tags = ui.checkbox(
+                        "Leave out tags and cover art", value=False
+                    )
+                    self.sync_mode = ui.select(
+                        options={
+                            SyncMode.NEVER.value: "Never",
+                            SyncMode.DIRECTORY.value: "Once per folder",
+                            SyncMode.FILE.value: "After every file",
+                        },
+                        label="Flush to Device",
+                        value=SyncMode.NEVER.value,
+                    ).classes("w-full")
+                    self.verify_mode = ui.select(
+                        options={
+                            VerifyMode.NEVER.value: "Never",
+                            VerifyMode.REPORT.value: "Read back and report",
+                            VerifyMode.REWRITE.value: (
+                                "Read back and rewrite bad files"
+                            ),
+                        },
+                        label="Verify After Copy",
+                        value=VerifyMode.NEVER.value,
+                    ).classes("w-full")
+                    ui.button(
+                        "Compare Copy Speed", on_click=self.compare_copy_speed
+                    ).props("outline")
+        with ui.row().bind_visibility_from(self.dst_dir, "value"):
+            ui.button("Preview", on_click=self.preview_export).props(
+                "icon-right=preview outline"
+            )
+            self.save_button = ui.button(
+                "Save", on_click=self.export_contents
+            ).props("icon-right=save_alt")
+            ui.button("Add to Queue", on_click=self.queue_export).props(
+                "icon-right=playlist_add outline"
+            )
+        self.results = ui.row().classes("w-full justify-center")
+        with ui.expansion("Export Queue").classes("w-full"):
+            with ui.row():
+                # Bound to the shared queue so every client shows its limits.
+                self.max_running = ui.number(
+                    label="Exports at Once",
+                    value=job_queue.max_running,
+                    min=1,
+                    max=job_queue.max_workers,
+                    precision=0,
+                    on_change=self.set_queue_limits,
+                ).bind_value_from(job_queue, "max_running")
+                self.max_per_device = ui.number(
+                    label="Exports per Device",
+                    value=job_queue.max_per_device,
+                    min=1,
+                    max=MAX_QUEUE_WORKERS,
+                    precision=0,
+                    on_change=self.set_queue_limits,
+                ).bind_value_from(job_queue, "max_per_device")
+            self.job_table = ui.table(
+                columns=[
+                    {
+                        "name": "state",
+                        "label": "State",
+                        "field": "state",
+                        "align": "left",
+                    },
+                    {
+                        "name": "source",
+                        "label": "Source",
+                        "field": "source",
+                        "align": "left",
+                    },
+                    {
+                        "name": "destination",
+                        "label": "Destination",
+                        "field": "destination",
+                        "align": "left",
+                    },
+                    {
+                        "name": "status",
+                        "label": "Status",
+                        "field": "status",
+                        "align": "left",
+                    },
+                ],
+                rows=[],
+                row_key="id",
+                selection="multiple",
+            ).classes("w-full")
+            with ui.row():
+                ui.button("Cancel", on_click=self.cancel_selected_jobs).props(
+                    "outline"
+                )
+                ui.button("Retry", on_click=self.retry_selected_jobs).props(
+                    "outline"
+                )
+                ui.button("Remove", on_click=self.remove_selected_jobs).props(
+                    "outline"
+                )
+                ui.button(
+                    "Clear Finished",
+                    on_click=lambda: (job_queue.clear_finished(), self.refresh_jobs()),
+                ).props("outline")
+            ui.timer(1.0, self.refresh_jobs)
+
+    async def rescan_source(self):
+        await asyncio.to_thread(source_library.forget, self.src_dir.value)
+        ui.notify(f"{self.src_dir.value} will be scanned again", position="top")
+
+    def show_export_plan(self, plan: ExportPlan, preflight: PreflightReport):
+        self.results.clear()
+        with self.results, ui.card().classes("w-full"):
+            ui.label(
+                f"{len(plan.files)} files, {format_bytes(plan.total_bytes)} "
+                f"to {plan.root_path}"
+            ).classes("font-bold")
+            ui.label(
+                f"Needs {format_bytes(preflight.required_bytes)} with "
+                f"{format_bytes(preflight.cluster_size)} clusters, "
+                f"{format_bytes(preflight.free_bytes)} free"
+            )
+            if preflight.write_rate is not None:
+                ui.label(
+                    f"Write speed {preflight.write_rate / (1024 * 1024):.1f} MB/s"
+                )
+            for warning in plan.warnings + preflight.warnings:
+                ui.label(warning)
+            for error in plan.errors + preflight.errors:
+                ui.label(error).classes("text-red-700")
+            ui.table(
+                columns=[
+                    {
+                        "name": "source",
+                        "label": "Source",
+                        "field": "source",
+                        "align": "left",
+                    },
+                    {
+                        "name": "destination",
+                        "label": "Destination",
+                        "field": "destination",
+                        "align": "left",
+                    },
+                    {"name": "size", "label": "Size", "field": "size"},
+                ],
+                rows=[
+                    {
+                        "source": os.path.relpath(f.src, plan.src_directory),
+                        "destination": os.path.relpath(f.dst, plan.root_path),
+                        "size": format_bytes(f.size),
+                    }
+                    for f in plan.files
+                ],
+                row_key="destination",
+                pagination=10,
+            ).classes("w-full")
+
+    async def preview_export(self):
+        self.results.clear()
+        with self.results:
+            ui.spinner("dots", size="xl")
+        try:
+            plan = await asyncio.to_thread(
+                plan_export,
+                self.content_type.value,
+                self.src_dir.value,
+                self.dst_dir.value,
+                self.dst_name.value,
+                languages=self.selected_languages(),
+            )
+            preflight = await asyncio.to_thread(
+                preflight_export, plan, self.probe_speed.value
+            )
+        except Exception as ex:
+            self.results.clear()
+            ui.notify(f"Error: {ex}", position="top", type="negative")
+        else:
+            self.show_export_plan(plan, preflight)
+
+    def show_export_progress(
+        self, progresses: dict, cancel: CancellationToken
+    ) -> ui.timer:
+        bars = dict()
+        with self.results, ui.column().classes("w-full"):
+            for label in progresses:
+                if len(progresses) > 1:
+                    ui.label(label).classes("font-bold")
+                bars[label] = (
+                    ui.linear_progress(value=0, show_value=False),
+                    ui.label("Preparing export..."),
+                )
+            cancel_button = ui.button("Cancel", on_click=cancel.cancel).props(
+                "icon-right=cancel outline"
+            )
+            cancel_button.bind_enabled_from(
+                cancel, "cancelled", backward=lambda c: not c
+            )
+
+        def update():
+            for label, progress in progresses.items():
+                snapshot = progress.snapshot()
+                if snapshot.total_files <= 0:
+                    continue
+                progress_bar, progress_label = bars[label]
+                progress_bar.set_value(snapshot.fraction)
+                eta = (
+                    format_duration(snapshot.eta)
+                    if snapshot.eta is not None
+                    else "--:--"
+                )
+                progress_label.set_text(
+                    f"{snapshot.files_done}/{snapshot.total_files} files, "
+                    f"{format_bytes(snapshot.bytes_done)} of "
+                    f"{format_bytes(snapshot.total_bytes)} at "
+                    f"{snapshot.rate / (1024 * 1024):.1f} MB/s, ETA {eta}"
+                )
+
+        return ui.timer(0.5, update)
+
+    def selected_languages(self) -> tuple:
+        return tuple(self.languages.value or DEFAULT_LANGUAGES)
+
+    def copy_options_from_ui(self) -> CopyOptions:
+        return CopyOptions(
+            backend=CopyBackend(self.copy_backend.value),
+            preserve_metadata=self.preserve_metadata.value,
+            sync_mode=SyncMode(self.sync_mode.value),
+            strip_tags=self.strip_tags.value,
+            verify=VerifyMode(self.verify_mode.value),
+        )
+
+    async def compare_copy_speed(self):
+        self.results.clear()
+        with self.results:
+            ui.spinner("dots", size="xl")
+        try:
+            plan = await asyncio.to_thread(
+                plan_export,
+                self.content_type.value,
+                self.src_dir.value,
+                self.dst_dir.value,
+                self.dst_name.value,
+                languages=self.selected_languages(),
+            )
+            comparison = await asyncio.to_thread(
+                compare_copy_backends,
+                plan,
+                self.copy_options_from_ui(),
+                int(self.copy_workers.value or DEFAULT_COPY_WORKERS),
+            )
+        except Exception as ex:
+            self.results.clear()
+            ui.notify(f"Error: {ex}", position="top", type="negative")
+            return
+
+        self.results.clear()
+        with self.results:
+            ui.table(
+                columns=[
+                    {"name": "backend", "label": "Backend", "field": "backend"},
+                    {"name": "files", "label": "Files", "field": "files"},
+                    {"name": "bytes", "label": "Size", "field": "bytes"},
+                    {"name": "seconds", "label": "Seconds", "field": "seconds"},
+                    {"name": "rate", "label": "MB/s", "field": "rate"},
+                ],
+                rows=[
+                    {
+                        "backend": r["backend"],
+                        "files": r["files"],
+                        "bytes": format_bytes(r["bytes"]),
+                        "seconds": f"{r['seconds']:.2f}",
+                        "rate": f"{r['rate'] / (1024 * 1024):.1f}",
+                    }
+                    for r in comparison
+                ],
+                row_key="backend",
+            )
+
+    async def export_contents(self):
+        if len(self.extra_drives.value or []) > 0:
+            await self.fan_out_contents()
+            return
+        self.results.clear()
+        self.save_button.disable()
+        progress = ExportProgress()
+        cancel = CancellationToken()
+        progress_timer = self.show_export_progress(
+            {self.dst_dir.value: progress}, cancel
+        )
+        workers = int(self.copy_workers.value or DEFAULT_COPY_WORKERS)
+        device_copy_workers[destination_device(self.dst_dir.value)] = workers
+        try:
+            result = await export_pool.run_async(
+                handle_export_contents,
+                self.content_type.value,
+                self.src_dir.value,
+                self.dst_dir.value,
+                self.dst_name.value,
+                workers,
+                self.incremental.value,
+                self.use_hash.value,
+                progress=progress,
+                copy_options=self.copy_options_from_ui(),
+                probe_speed=self.probe_speed.value,
+                languages=self.selected_languages(),
+                cancel=cancel,
+            )
+        except Exception as ex:
+            ui.notify(f"Error: {ex}", position="top", type="negative")
+        else:
+            if result.cancelled:
+                ui.notify(
+                    f"Export cancelled, {result.copied} files were copied",
+                    position="top",
+                    type="warning",
+                )
+            else:
+                ui.notify(
+                    f"Content Saved! {result.copied} copied, "
+                    f"{result.skipped} unchanged, {result.removed} removed"
+                    f"{verification_text(result)}",
+                    position="top",
+                    type="positive" if len(result.mismatched) <= 0 else "negative",
+                )
+        finally:
+            progress_timer.cancel()
+            self.src_dir.clear()
+            self.dst_dir.clear()
+            self.dst_name.set_value("01")
+            self.results.clear()
+            self.save_button.enable()
+
+    async def fan_out_contents(self):
+        self.results.clear()
+        self.save_button.disable()
+        dst_directories = list(
+            dict.fromkeys([self.dst_dir.value] + self.extra_drives.value)
+        )
+        progresses = {d: ExportProgress() for d in dst_directories}
+        cancel = CancellationToken()
+        progress_timer = self.show_export_progress(progresses, cancel)
+        try:
+            device_results = await export_pool.run_async(
+                handle_fan_out_export,
+                self.content_type.value,
+                self.src_dir.value,
+                dst_directories,
+                self.dst_name.value,
+                self.incremental.value,
+                self.use_hash.value,
+                progresses=progresses,
+                copy_options=self.copy_options_from_ui(),
+                probe_speed=self.probe_speed.value,
+                languages=self.selected_languages(),
+                cancel=cancel,
+            )
+        except Exception as ex:
+            ui.notify(f"Error: {ex}", position="top", type="negative")
+        else:
+            for dst_directory, result in device_results.items():
+                if result.error is not None:
+                    ui.notify(
+                        f"{dst_directory}: {result.error}",
+                        position="top",
+                        type="negative",
+                    )
+                elif result.cancelled:
+                    ui.notify(
+                        f"{dst_directory} cancelled, {result.copied} files "
+                        "were copied",
+                        position="top",
+                        type="warning",
+                    )
+                else:
+                    ui.notify(
+                        f"{dst_directory} saved! {result.copied} copied, "
+                        f"{result.skipped} unchanged, {result.removed} removed"
+                        f"{verification_text(result)}",
+                        position="top",
+                        type=(
+                            "positive" if len(result.mismatched) <= 0 else "negative"
+                        ),
+                    )
+        finally:
+            progress_timer.cancel()
+            self.src_dir.clear()
+            self.dst_dir.clear()
+            self.extra_drives.set_value([])
+            self.dst_name.set_value("01")
+            self.results.clear()
+            self.save_button.enable()
+
+    def queue_export(self):
+        job_queue.add(
+            ExportJob(
+                self.content_type.value,
+                self.src_dir.value,
+                self.dst_dir.value,
+                self.dst_name.value,
+                self.incremental.value,
+                self.use_hash.value,
+                list(self.selected_languages()),
+                self.copy_backend.value,
+                self.preserve_metadata.value,
+                self.sync_mode.value,
+                self.strip_tags.value,
+                self.verify_mode.value,
+            )
+        )
+        ui.notify(f"Queued export to {self.dst_dir.value}", position="top")
+        self.dst_dir.clear()
+        self.refresh_jobs()
+
+    def refresh_jobs(self):
+        rows = [
+            {
+                "id": job.id,
+                "state": job.state.capitalize(),
+                "source": job.src_directory,
+                "destination": os.path.join(job.dst_directory, job.dst_name),
+                "status": job_status(job),
+            }
+            for job in job_queue.jobs()
+        ]
+        if rows != self.job_table.rows:
+            self.job_table.rows = rows
+            self.job_table.update()
+
+    def set_queue_limits(self):
+        job_queue.max_running = min(
+            int(self.max_running.value or 1), job_queue.max_workers
+        )
+        job_queue.max_per_device = int(self.max_per_device.value or 1)
+        job_queue.schedule()
+
+    def remove_selected_jobs(self):
+        for row in self.job_table.selected:
+            job_queue.remove(row["id"])
+        self.job_table.selected.clear()
+        self.refresh_jobs()
+
+    def cancel_selected_jobs(self):
+        for row in self.job_table.selected:
+            job_queue.cancel(row["id"])
+        self.job_table.selected.clear()
+        self.refresh_jobs()
+
+    def retry_selected_jobs(self):
+        for row in self.job_table.selected:
+            job_queue.retry(row["id"])
+        self.job_table.selected.clear()
+        self.refresh_jobs()
+
+
+@ui.page("/")
+def index():
+    ExportPage()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="SeedPlayer Content Tool")
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="serve the tool to browsers instead of opening a window",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="server address (default: %(default)s, this machine only); pass "
+        "0.0.0.0 to serve every network interface, but note the tool has no "
+        "login and anyone who can reach it can browse, write and delete files",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8080, help="server port (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--export-processes",
+        type=int,
+        default=EXPORT_PROCESSES,
+        help="exports that run at once, each in its own process "
+        "(default: %(default)s)",
+    )
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    export_pool.max_workers = max(1, args.export_processes)
+    job_queue.pool = export_pool
+    app.on_startup(job_queue.schedule)
+    app.on_shutdown(export_pool.shutdown)
+
+    startup_probe = os.environ.get("SEEDPLAYER_STARTUP_PROBE")
+    if startup_probe:
+        # Used by benchmarks/startup.py to time launch to first window.
+        def report_first_window():
+            Path(startup_probe).write_text("connected", encoding="utf-8")
+            app.shutdown()
+
+        app.on_connect(report_first_window)
+
+    if args.server:
+        ui.run(
+            host=args.host,
+            port=args.port,
+            show=False,
+            reload=False,
+            title="SeedPlayer Content Tool",
+            favicon="🌱",
+        )
+    else:
+        ui.run(
+            native=True,
+            window_size=(800, 600),
+            fullscreen=False,
+            reload=False,
+            title="SeedPlayer Content Tool",
+            favicon="🌱",
+        )
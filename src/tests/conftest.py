@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The seedplayer package lives next to this folder rather than installed,
+# so plain pytest finds it from the repository root, src or tests.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seedplayer.library import source_library  # noqa: E402
+from seedplayer.ordering import tag_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_library(tmp_path, monkeypatch):
+    # Keeps the tag cache, run logs and library index of each test apart
+    # from the user's own and from the other tests.
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(source_library, "path", tmp_path / "library.sqlite3")
+    monkeypatch.setattr(source_library, "_db", None)
+    monkeypatch.setattr(tag_cache, "path", tmp_path / "tags.json")
+    monkeypatch.setattr(tag_cache, "_entries", None)
@@ -0,0 +1,143 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from seedplayer.archives import copy_member_audio
+from seedplayer.cli import main
+
+AUDIO = b"\xff\xfb\x90\x64" + os.urandom(8 * 1024)
+ID3V1 = b"TAG" + bytes(125)
+
+
+def id3v2(body: bytes) -> bytes:
+    size = bytes((len(body) >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x03\x00\x00" + size + body
+
+
+def write_archive(path, members: dict):
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+    else:
+        compression = {".tar": "", ".gz": "gz", ".xz": "xz", ".bz2": "bz2"}
+        with tarfile.open(path, f"w:{compression[path.suffix]}") as tar:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = 1_700_000_000
+                tar.addfile(info, io.BytesIO(data))
+
+
+def export_archive(tmp_path, archive, *options) -> dict:
+    card = tmp_path / "card"
+    assert main([str(archive), str(card), "-q", "--type", "Other", *options]) == 0
+    root = card / "01"
+    return {
+        os.path.relpath(os.path.join(d, f), root): (
+            open(os.path.join(d, f), "rb").read()
+        )
+        for d, _, names in os.walk(root)
+        for f in names
+        if f.endswith(".mp3")
+    }
+
+
+class ReadRecorder(io.BytesIO):
+    largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size if size >= 0 else 1 << 62)
+        return super().read(size)
+
+
+def test_cover_art_is_skipped_in_chunks():
+    data = id3v2(os.urandom(1024 * 1024)) + AUDIO + ID3V1
+    fsrc = ReadRecorder(data)
+    fdst = io.BytesIO()
+    copy_member_audio(fsrc, fdst, len(data), 64 * 1024, None)
+    assert fdst.getvalue() == AUDIO
+    assert fsrc.largest_read <= 64 * 1024
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar", ".tar.gz", ".tar.bz2", ".tar.xz"])
+def test_archive_exports_like_its_folder(tmp_path, suffix):
+    members = {
+        "Intro_1.mp3": os.urandom(500),
+        "Series/Talks/Talk_2.mp3": os.urandom(3000),
+        "Series/Talks/Talk_10.mp3": os.urandom(2000),
+        "Series/Talks/Talk_1.mp3": os.urandom(1000),
+        "Series/Talks/notes.txt": b"not audio",
+        "Series/cover.jpg": os.urandom(100),
+    }
+    folder = tmp_path / "folder"
+    for name, data in members.items():
+        (folder / name).parent.mkdir(parents=True, exist_ok=True)
+        (folder / name).write_bytes(data)
+    archive = tmp_path / f"talks{suffix}"
+    write_archive(archive, members)
+
+    from_archive = export_archive(tmp_path / "a", archive)
+    assert from_archive == export_archive(tmp_path / "f", folder)
+    assert from_archive == {
+        "001 Intro.mp3": members["Intro_1.mp3"],
+        "01/001 Talk.mp3": members["Series/Talks/Talk_1.mp3"],
+        "01/002 Talk.mp3": members["Series/Talks/Talk_2.mp3"],
+        "01/010 Talk.mp3": members["Series/Talks/Talk_10.mp3"],
+    }
+
+
+def test_unchanged_archive_is_not_copied_again(tmp_path, capsys):
+    archive = tmp_path / "talks.tar.gz"
+    write_archive(archive, {f"Talks/Talk_{n}.mp3": os.urandom(1000) for n in (1, 2)})
+    args = [str(archive), str(tmp_path / "card"), "-q", "--type", "Other"]
+    for _ in range(2):
+        assert main(args + ["--incremental"]) == 0
+    summary = capsys.readouterr().out.splitlines()[-1]
+    assert summary == "0 copied, 2 unchanged, 0 removed"
+
+
+@pytest.mark.parametrize("suffix", [".zip", ".tar.gz"])
+def test_tags_are_stripped_from_members(tmp_path, suffix):
+    archive = tmp_path / f"talks{suffix}"
+    damaged = id3v2(os.urandom(4096))
+    damaged = damaged[:6] + b"\x00\x00\x00\x10" + damaged[10:] + AUDIO
+    write_archive(
+        archive,
+        {
+            "Talks/Talk_1.mp3": id3v2(os.urandom(300 * 1024)) + AUDIO + ID3V1,
+            "Talks/Talk_2.mp3": damaged,
+            "Talks/Talk_3.mp3": AUDIO[:100] + ID3V1,
+        },
+    )
+    assert export_archive(tmp_path, archive, "--strip-tags") == {
+        "01/001 Talk.mp3": AUDIO,
+        "01/002 Talk.mp3": damaged,
+        "01/003 Talk.mp3": AUDIO[:100],
+    }
+
+
+@pytest.mark.parametrize("damage", ["truncated", "corrupted", "junk"])
+@pytest.mark.parametrize("suffix", [".zip", ".tar.gz", ".tar.xz", ".tar.bz2"])
+def test_damaged_archive_is_an_error(tmp_path, capsys, suffix, damage):
+    archive = tmp_path / f"talks{suffix}"
+    write_archive(
+        archive,
+        {f"Talks/Talk_{n}.mp3": os.urandom(64 * 1024) for n in range(1, 4)},
+    )
+    data = bytearray(archive.read_bytes())
+    if damage == "truncated":
+        data = data[: len(data) // 2]
+    elif damage == "corrupted":
+        for index in range(len(data) // 3, len(data) // 3 + 256):
+            data[index] ^= 0x55
+    else:
+        data = os.urandom(len(data))
+    archive.write_bytes(data)
+
+    card = tmp_path / "card"
+    assert main([str(archive), str(card), "-q", "--type", "Other"]) == 1
+    assert "is damaged or not a supported archive" in capsys.readouterr().err
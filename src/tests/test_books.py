@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from seedplayer.plan import plan_export
+
+
+def plan_books(tmp_path, names, content_type="Bible", languages=("en",)):
+    src = tmp_path / "src"
+    for name in names:
+        os.makedirs(src / name)
+        (src / name / "Chapter_1.mp3").write_bytes(b"\xff\xfb" + bytes(64))
+    return plan_export(
+        content_type, str(src), str(tmp_path / "card"), languages=languages
+    )
+
+
+def exported_folders(plan) -> dict:
+    # Source folder name to the card folder its chapters go to.
+    return {
+        os.path.basename(os.path.dirname(f.src)): os.path.dirname(
+            plan.relative_path(f.dst)
+        )
+        for f in plan.files
+    }
+
+
+@pytest.mark.parametrize(
+    "name, folder",
+    [
+        ("Genesis", "01"),
+        ("Gen", "01"),
+        ("Génesis", "01"),
+        ("1 John", "62"),
+        ("I John", "62"),
+        ("First John", "62"),
+        ("1st John", "62"),
+        ("Song of Songs", "22"),
+    ],
+)
+def test_book_names_and_aliases(tmp_path, name, folder):
+    plan = plan_books(tmp_path, [name])
+    assert plan.errors == []
+    assert plan.warnings == []
+    assert exported_folders(plan) == {name: folder}
+
+
+@pytest.mark.parametrize(
+    "name, folder, confidence",
+    [
+        ("IJohn", "62", "90%"),
+        ("01_Genesis", "01", "90%"),
+        ("Genesis (KJV)", "01", "90%"),
+        ("Psalms", "19", "95%"),
+        ("Genesis Audio", "01", "73%"),
+    ],
+)
+def test_tolerant_matches_are_exported_with_a_warning(
+    tmp_path, name, folder, confidence
+):
+    plan = plan_books(tmp_path, [name])
+    assert plan.errors == []
+    assert len(plan.warnings) == 1
+    assert plan.warnings[0].startswith(f"Matched {name} to ")
+    assert plan.warnings[0].endswith(f"({confidence})")
+    assert exported_folders(plan) == {name: folder}
+
+
+@pytest.mark.parametrize("name", ["Gen Recordings Collection", "Gene", "Zzz"])
+def test_names_below_the_threshold_are_plan_errors(tmp_path, name):
+    plan = plan_books(tmp_path, ["Exodus", name])
+    assert plan.errors == [f"Could not resolve the book number for {name}"]
+    assert exported_folders(plan)["Exodus"] == "02"
+    assert exported_folders(plan).get(name, "") == ""
+
+
+def test_new_testament_numbers_from_matthew(tmp_path):
+    plan = plan_books(tmp_path, ["Matthew", "Revelation", "Genesis"], "New Testament")
+    assert plan.errors == ["Could not resolve the book number for Genesis"]
+    folders = exported_folders(plan)
+    assert (folders["Matthew"], folders["Revelation"]) == ("01", "27")
+    assert folders.get("Genesis", "") == ""
+
+
+def test_catalog_languages(tmp_path):
+    plan = plan_books(tmp_path, ["Éxodo", "1 Juan"], languages=("es",))
+    assert plan.errors == []
+    assert exported_folders(plan) == {"Éxodo": "02", "1 Juan": "62"}
+    assert plan.book_matches["Éxodo"].book == "Éxodo"
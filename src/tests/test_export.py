@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+from seedplayer.cli import main
+from seedplayer.manifest import MANIFEST_NAME, read_manifest
+
+
+def make_source(path, chapters=3):
+    for book in ("Genesis", "Exodus"):
+        os.makedirs(path / book)
+        for chapter in range(1, chapters + 1):
+            (path / book / f"{book}_{chapter}.mp3").write_bytes(os.urandom(2048))
+    # Old enough that the library index trusts the folder mtimes.
+    an_hour_ago = time.time() - 3600
+    for directory in (path, path / "Genesis", path / "Exodus"):
+        os.utime(directory, (an_hour_ago, an_hour_ago))
+
+
+def card_files(path) -> list:
+    return sorted(
+        os.path.relpath(os.path.join(d, f), path)
+        for d, _, names in os.walk(path)
+        for f in names
+        if f.endswith(".mp3")
+    )
+
+
+def export(src, card, *options) -> int:
+    return main(
+        [str(src), str(card), "-q", "--incremental", "--type", "Other", *options]
+    )
+
+
+@pytest.mark.parametrize("problem", ["moved", "empty", "unreadable"])
+def test_unreadable_source_leaves_card_alone(tmp_path, problem):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    assert export(src, card) == 0
+    exported = card_files(card)
+    assert len(exported) == 6
+
+    if problem == "moved":
+        shutil.move(src, tmp_path / "elsewhere")
+    elif problem == "empty":
+        shutil.rmtree(src)
+        src.mkdir()
+    else:
+        if os.geteuid() == 0:
+            pytest.skip("root can read any folder")
+        src.chmod(0)
+
+    try:
+        assert export(src, card) != 0
+    finally:
+        if src.exists():
+            src.chmod(0o755)
+    assert card_files(card) == exported
+
+
+@pytest.mark.parametrize("option", ["--hash", "--rescan"])
+@pytest.mark.parametrize("size", [2048, 2248])
+def test_chapter_rewritten_in_place_is_copied(tmp_path, size, option):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    assert export(src, card, option) == 0
+
+    chapter = src / "Genesis" / "Genesis_2.mp3"
+    directory_stat = os.stat(chapter.parent)
+    audio = os.urandom(size)
+    chapter.write_bytes(audio)
+    os.utime(chapter, ns=(directory_stat.st_mtime_ns, directory_stat.st_mtime_ns + 1))
+    # Rewriting a file in place leaves its directory's mtime alone.
+    os.utime(
+        chapter.parent, ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns)
+    )
+
+    assert export(src, card, option) == 0
+    copies = [
+        card / "01" / path
+        for path, entry in read_manifest(card / "01").items()
+        if entry["source"] == str(chapter)
+    ]
+    assert [c.read_bytes() == audio for c in copies] == [True]
+
+
+def test_files_with_the_same_card_name_are_a_plan_error(tmp_path, capsys):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    (src / "Genesis" / "Genesis 1.mp3").write_bytes(os.urandom(2048))
+
+    assert main([str(src), str(card), "--dry-run", "--type", "Other"]) == 1
+    assert "both export to 02/001 Genesis.mp3" in capsys.readouterr().err
+    assert export(src, card) == 1
+    assert not card.exists()
+
+
+def test_manifest_paths_outside_the_export_are_left_alone(tmp_path):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    assert export(src, card) == 0
+
+    outside = [tmp_path / "outside.mp3", tmp_path / "absolute.mp3"]
+    for path in outside:
+        path.write_bytes(b"keep")
+    manifest_path = card / "01" / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    entry = next(iter(manifest["files"].values()))
+    manifest["files"]["../../outside.mp3"] = entry
+    manifest["files"][str(outside[1])] = entry
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+
+    assert set(read_manifest(card / "01")) == set(manifest["files"]) - {
+        "../../outside.mp3",
+        str(outside[1]),
+    }
+    assert export(src, card) == 0
+    assert [path.read_bytes() for path in outside] == [b"keep", b"keep"]
@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from seedplayer import fanout
+from seedplayer.cli import main
+from seedplayer.manifest import read_manifest
+
+AUDIO = b"\xff\xfb\x90\x64" + os.urandom(8 * 1024)
+ID3V2 = b"ID3\x03\x00\x00\x00\x00\x02\x00" + bytes(256)
+
+
+def make_source(path, chapters=3):
+    for book in ("Genesis", "Exodus"):
+        os.makedirs(path / book)
+        for chapter in range(1, chapters + 1):
+            (path / book / f"{book}_{chapter}.mp3").write_bytes(ID3V2 + AUDIO)
+
+
+def card_contents(card) -> dict:
+    root = card / "01"
+    return {
+        relative_path: (root / relative_path).read_bytes()
+        for relative_path in read_manifest(root)
+    }
+
+
+def fan_out(src, cards, *options) -> int:
+    also = [option for card in cards[1:] for option in ("--also", str(card))]
+    return main(
+        [str(src), str(cards[0]), "-q", "--type", "Other", *also, *options]
+    )
+
+
+@pytest.mark.parametrize("options", [[], ["--strip-tags"]])
+def test_every_device_gets_the_same_files(tmp_path, options):
+    src = tmp_path / "src"
+    cards = [tmp_path / "a", tmp_path / "b", tmp_path / "c"]
+    make_source(src)
+
+    assert fan_out(src, cards, *options) == 0
+    expected = AUDIO if options else ID3V2 + AUDIO
+    contents = card_contents(cards[0])
+    assert len(contents) == 6
+    assert set(contents.values()) == {expected}
+    assert [card_contents(card) for card in cards[1:]] == [contents, contents]
+
+
+@pytest.mark.parametrize("options", [[], ["--strip-tags"]])
+def test_device_that_falls_behind_finishes_from_the_source(
+    tmp_path, monkeypatch, options
+):
+    # The slow card stops being fed in the middle of the first file, so it
+    # has to resume that file at the right offset and copy the rest itself.
+    monkeypatch.setattr(fanout, "FANOUT_CHUNK_SIZE", 1024)
+    feed = fanout.FanOutTarget.feed
+    fed = {"count": 0}
+
+    def lagging_feed(target, message):
+        if target.plan.root_path.parent.name == "slow":
+            fed["count"] += 1
+            if fed["count"] > 4:
+                target.detached.set()
+                return False
+        return feed(target, message)
+
+    monkeypatch.setattr(fanout.FanOutTarget, "feed", lagging_feed)
+    src = tmp_path / "src"
+    cards = [tmp_path / "fast", tmp_path / "slow"]
+    make_source(src)
+
+    assert fan_out(src, cards, *options) == 0
+    assert fed["count"] > 4
+    expected = AUDIO if options else ID3V2 + AUDIO
+    assert set(card_contents(cards[0]).values()) == {expected}
+    assert card_contents(cards[1]) == card_contents(cards[0])
+
+
+def test_failing_device_does_not_stop_the_others(tmp_path, monkeypatch, capsys):
+    finish_file = fanout.FanOutTarget._finish_file
+
+    def failing_finish(target, fdst):
+        if target.plan.root_path.parent.name == "broken" and target._next == 1:
+            fdst.close()
+            raise OSError(5, "Input/output error")
+        finish_file(target, fdst)
+
+    monkeypatch.setattr(fanout.FanOutTarget, "_finish_file", failing_finish)
+    src = tmp_path / "src"
+    cards = [tmp_path / "broken", tmp_path / "good"]
+    make_source(src)
+
+    assert fan_out(src, cards) == 1
+    assert f"error: {cards[0]}: [Errno 5] Input/output error" in (
+        capsys.readouterr().err
+    )
+    assert set(card_contents(cards[1]).values()) == {ID3V2 + AUDIO}
+    assert len(card_contents(cards[1])) == 6
+    assert read_manifest(cards[0] / "01") == dict()
+
+
+def test_destination_that_is_not_a_folder_is_reported(tmp_path, capsys):
+    src = tmp_path / "src"
+    cards = [tmp_path / "good", tmp_path / "not-a-folder"]
+    make_source(src)
+    cards[1].write_bytes(b"")
+
+    assert fan_out(src, cards) == 1
+    assert f"error: {cards[1]}:" in capsys.readouterr().err
+    assert len(card_contents(cards[0])) == 6
@@ -0,0 +1,35 @@
+import threading
+import time
+
+from seedplayer.jobs import ExportJob, JobQueue, JobState
+from seedplayer.workers import ExportPool
+
+
+class BlockedPool(ExportPool):
+    # Holds every export until released, counting how many it was given.
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers)
+        self.release = threading.Event()
+        self.started = 0
+
+    def run(self, function, *args, **kwargs):
+        self.started += 1
+        self.release.wait(10)
+        raise OSError("not exported")
+
+
+def test_running_jobs_are_limited_to_the_pool(tmp_path):
+    pool = BlockedPool(max_workers=2)
+    queue = JobQueue(tmp_path / "jobs.json", max_running=8, max_per_device=8, pool=pool)
+    for n in range(5):
+        queue.add(ExportJob("Other", str(tmp_path / "src"), str(tmp_path / f"{n}")))
+    states = [job.state for job in queue.jobs()]
+    assert states.count(JobState.RUNNING.value) == 2
+    assert states.count(JobState.QUEUED.value) == 3
+
+    pool.release.set()
+    deadline = time.monotonic() + 10
+    while any(job.state != JobState.FAILED.value for job in queue.jobs()):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert pool.started == 5
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from seedplayer.cli import main
+
+AUDIO = b"\xff\xfb\x90\x64" + os.urandom(4096)
+
+
+def syncsafe(size: int) -> bytes:
+    return bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def id3v2(body: bytes, version: int = 3, footer: bool = False) -> bytes:
+    flags = 0x10 if footer else 0
+    header = bytes([version, 0, flags]) + syncsafe(len(body))
+    tag = b"ID3" + header + body
+    if footer:
+        tag += b"3DI" + header
+    return tag
+
+
+def cover_art(size: int) -> bytes:
+    payload = b"\x00image/jpeg\x00\x03\x00" + os.urandom(size)
+    return b"APIC" + len(payload).to_bytes(4, "big") + b"\x00\x00" + payload
+
+
+ID3V1 = b"TAG" + b"Title".ljust(125, b"\x00")
+
+
+def export_file(tmp_path, data: bytes, *options) -> bytes:
+    src = tmp_path / "src"
+    os.makedirs(src / "Talks")
+    (src / "Talks" / "Talk_1.mp3").write_bytes(data)
+    card = tmp_path / "card"
+    status = main([str(src), str(card), "-q", "--type", "Other", *options])
+    assert status == 0
+    return (card / "01" / "01" / "001 Talk.mp3").read_bytes()
+
+
+@pytest.mark.parametrize("backend", ["fast", "copy2"])
+def test_tags_and_cover_art_are_stripped(tmp_path, backend):
+    data = id3v2(cover_art(300 * 1024) + b"\x00" * 512) + AUDIO + ID3V1
+    assert export_file(tmp_path, data, "--strip-tags", "--backend", backend) == AUDIO
+
+
+def test_stacked_tags_and_footer_are_stripped(tmp_path):
+    data = id3v2(cover_art(64), 4, footer=True) + id3v2(cover_art(64)) + AUDIO
+    assert export_file(tmp_path, data, "--strip-tags") == AUDIO
+
+
+def test_tags_are_kept_without_strip_tags(tmp_path):
+    data = id3v2(cover_art(1024)) + AUDIO + ID3V1
+    assert export_file(tmp_path, data) == data
+
+
+def test_file_without_frame_sync_after_the_tag_is_copied_whole(tmp_path):
+    # The tag claims less than it holds, so its end isn't audio; cutting
+    # there would lose data.
+    tag = id3v2(cover_art(1024))
+    data = tag[:6] + syncsafe(100) + tag[10:] + AUDIO
+    assert export_file(tmp_path, data, "--strip-tags") == data
+
+
+def test_only_a_trailing_id3v1_tag_is_stripped(tmp_path):
+    assert export_file(tmp_path, AUDIO + ID3V1, "--strip-tags") == AUDIO
@@ -0,0 +1,109 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from seedplayer import verify
+from seedplayer.cli import main
+from seedplayer.manifest import read_manifest
+
+AUDIO = b"\xff\xfb\x90\x64" + os.urandom(8 * 1024)
+ID3V2 = b"ID3\x03\x00\x00\x00\x00\x20\x00" + os.urandom(4096)
+ID3V1 = b"TAG" + bytes(125)
+BAD_FILE = os.path.join("01", "02", "002 Genesis.mp3")
+
+
+def make_source(path, chapters=3):
+    for book in ("Genesis", "Exodus"):
+        os.makedirs(path / book)
+        for chapter in range(1, chapters + 1):
+            (path / book / f"{book}_{chapter}.mp3").write_bytes(os.urandom(2048))
+
+
+def export(src, card, *options) -> int:
+    return main(
+        [str(src), str(card), "-q", "--incremental", "--type", "Other", *options]
+    )
+
+
+@pytest.fixture
+def bad_writes(monkeypatch):
+    # Stands in for a card that loses writes: BAD_FILE reads back damaged
+    # the first `count` times it is checked.
+    damaged = {"count": 0}
+    sync_files = verify.sync_files
+
+    def damaging_sync(paths):
+        for path in paths:
+            if str(path).endswith(BAD_FILE) and damaged["count"] > 0:
+                damaged["count"] -= 1
+                data = bytearray(path.read_bytes())
+                data[len(data) // 2] ^= 0xFF
+                path.write_bytes(data)
+        sync_files(paths)
+
+    monkeypatch.setattr(verify, "sync_files", damaging_sync)
+    return damaged
+
+
+def test_report_names_the_damaged_file(tmp_path, capsys, bad_writes):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    bad_writes["count"] = 1
+    assert export(src, card, "--verify", "report") == 1
+    out, err = capsys.readouterr()
+    assert out.splitlines()[-1] == "5 verified, 0 rewritten, 1 mismatched"
+    assert "error: 02/002 Genesis.mp3 does not match the source" in err
+    source_bytes = (src / "Genesis" / "Genesis_2.mp3").read_bytes()
+    assert (card / BAD_FILE).read_bytes() != source_bytes
+    # Left out of the manifest, so the next export copies it again.
+    assert "02/002 Genesis.mp3" not in read_manifest(card / "01")
+
+    assert export(src, card, "--verify", "report") == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "1 copied, 5 unchanged, 0 removed",
+        "1 verified, 0 rewritten, 0 mismatched",
+    ]
+    assert (card / BAD_FILE).read_bytes() == source_bytes
+
+
+@pytest.mark.parametrize("damaged, status", [(1, 0), (2, 1)])
+def test_rewrite_copies_the_damaged_file_again(
+    tmp_path, capsys, bad_writes, damaged, status
+):
+    src = tmp_path / "src"
+    card = tmp_path / "card"
+    make_source(src)
+    bad_writes["count"] = damaged
+    assert export(src, card, "--verify", "rewrite") == status
+    mismatched = damaged - 1
+    assert capsys.readouterr().out.splitlines()[-1] == (
+        f"{6 - mismatched} verified, 1 rewritten, {mismatched} mismatched"
+    )
+    source_bytes = (src / "Genesis" / "Genesis_2.mp3").read_bytes()
+    assert ((card / BAD_FILE).read_bytes() == source_bytes) == (status == 0)
+
+
+@pytest.mark.parametrize("archive", [False, True])
+def test_stripped_tags_verify(tmp_path, capsys, archive):
+    members = {f"Talks/Talk_{n}.mp3": ID3V2 + AUDIO + ID3V1 for n in (1, 2)}
+    if archive:
+        src = tmp_path / "talks.tar.gz"
+        with tarfile.open(src, "w:gz") as tar:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    else:
+        src = tmp_path / "talks"
+        for name, data in members.items():
+            (src / name).parent.mkdir(parents=True, exist_ok=True)
+            (src / name).write_bytes(data)
+    card = tmp_path / "card"
+    assert export(src, card, "--strip-tags", "--verify", "report") == 0
+    assert capsys.readouterr().out.splitlines()[-1] == (
+        "2 verified, 0 rewritten, 0 mismatched"
+    )
+    assert (card / "01" / "01" / "001 Talk.mp3").read_bytes() == AUDIO